@@ -11,13 +11,40 @@ import httpx
 from quality_orchestrator import QualityReport
 
 
+# One connection pool to the bridge shared by every BridgeIntegration
+_shared_client: Optional[httpx.AsyncClient] = None
+
+
+def get_shared_client() -> httpx.AsyncClient:
+    """Return the shared bridge HTTP client, creating it on first use"""
+    global _shared_client
+    if _shared_client is None or _shared_client.is_closed:
+        _shared_client = httpx.AsyncClient(
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+    return _shared_client
+
+
+async def close_shared_client():
+    """Close the shared bridge HTTP client (call on shutdown)"""
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
+
+
 class BridgeIntegration:
     """Handles communication with the main DevOps Paradise Bridge"""
     
     def __init__(self, client_id: str):
         self.client_id = client_id
         self.bridge_url = "http://localhost:8100"  # Main bridge URL
-        self.client = httpx.AsyncClient(timeout=30.0)
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared client; created lazily so it binds to the running event loop"""
+        return get_shared_client()
     
     async def notify_analysis_start(self, analysis_type: str, profile: str):
         """Notify bridge that analysis has started"""
@@ -26,7 +26,7 @@ from pydantic import BaseModel
 from quality_analyzers import QualityAnalyzer
 from test_runners import TestRunner
 from report_generator import ReportGenerator
-from bridge_integration import BridgeIntegration
+from bridge_integration import BridgeIntegration, close_shared_client
 
 # Configure logging
 logging.basicConfig(
@@ -153,6 +153,11 @@ class QualityOrchestrator:
     def _setup_routes(self):
         """Setup FastAPI routes"""
         
+        @self.app.on_event("shutdown")
+        async def close_bridge_client():
+            """Release the shared bridge connection pool"""
+            await close_shared_client()
+        
         @self.app.get("/health")
         async def health_check():
             """Health check endpoint"""
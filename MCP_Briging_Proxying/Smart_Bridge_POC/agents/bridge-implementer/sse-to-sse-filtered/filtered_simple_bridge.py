@@ -152,7 +152,7 @@ class FilteredBroker(Broker):
     
     def update_filter_config(self, new_config: FilterConfig):
         """Update content filter configuration at runtime"""
-        self.content_filter.config = new_config
+        self.content_filter.update_config(new_config)
         logger.info("Content filter configuration updated")
 
 # ----------------------------- FastAPI App --------------------------------
@@ -270,7 +270,8 @@ async def send_message(request: Request,
         method = payload.get("method", "no-method")
         
         logger.info(f"Received message from {client_info}: {method} (id: {message_id}, priority: {priority})")
-        logger.debug(f"Full message payload: {json.dumps(payload, indent=2)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Full message payload: %s", json.dumps(payload, indent=2))
     except Exception as e:
         logger.error(f"Failed to parse JSON from {client_info}: {e}")
         raise HTTPException(400, "Invalid JSON")
@@ -10,8 +10,9 @@ import logging
 import os
 import time
 import uuid
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Any, Dict, Set, Optional, List
+from typing import Any, Deque, Dict, Set, Optional, List
 
 # Python 3.8 compatibility
 try:
@@ -24,24 +25,39 @@ from fastapi import WebSocket
 try:
     from .sse_process import SSEProcess
     from .content_filters import ContentFilter, FilterConfig
-    from .models import FilterInfo
+    from .models import DATACLASS_SLOTS, FilterInfo, RouteCtx
 except ImportError:
     from sse_process import SSEProcess
     from content_filters import ContentFilter, FilterConfig
-    from models import FilterInfo
+    from models import DATACLASS_SLOTS, FilterInfo, RouteCtx
 
 logger = logging.getLogger("enhanced-broker")
 
-@dataclass
+SSE_MESSAGE_PREFIX = b"event: message\ndata: "
+SSE_EVENT_END = b"\n\n"
+MAX_PENDING_FRAMES = 100
+
+@dataclass(**DATACLASS_SLOTS)
 class EnhancedSession:
     """Enhanced session with filtering support"""
     session_id: str
-    queue: asyncio.Queue = field(default_factory=lambda: asyncio.Queue(maxsize=100))
+    frames: Deque[bytes] = field(default_factory=deque)
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    # Set by the stream each time it takes a frame, so a blocked push can retry
+    drained: asyncio.Event = field(default_factory=asyncio.Event)
     websockets: Set[WebSocket] = field(default_factory=set)
     last_beat: float = field(default_factory=time.time)
     filter_metrics: Dict[str, Any] = field(default_factory=dict)
     created_at: float = field(default_factory=time.time)
 
+    async def push(self, frame: bytes) -> None:
+        """Append an SSE frame and wake the stream, waiting for room while the buffer is full"""
+        while len(self.frames) >= MAX_PENDING_FRAMES:
+            self.drained.clear()
+            await self.drained.wait()
+        self.frames.append(frame)
+        self.wakeup.set()
+
 class EnhancedBroker:
     """Enhanced broker with SSE support and content filtering"""
     
@@ -59,6 +75,8 @@ class EnhancedBroker:
         
         # Performance monitoring
         self.start_time = time.time()
+        # Coarse wall clock, refreshed by tick() on the event paths rather than per stamp
+        self.now = self.start_time
         self.total_messages = 0
         self.error_count = 0
         
@@ -70,6 +88,11 @@ class EnhancedBroker:
         asyncio.create_task(self.pump())
         logger.info("✓ Enhanced broker started successfully")
         
+    def tick(self) -> float:
+        """Refresh the coarse clock used for session heartbeats and return it"""
+        self.now = time.time()
+        return self.now
+            
     async def _reader_loop(self):
         """Read messages from SSE process"""
         try:
@@ -80,6 +103,7 @@ class EnhancedBroker:
         except Exception as e:
             logger.exception("Enhanced reader loop ended: %s", e)
             self.error_count += 1
+            self.tick()
             await self.broadcast({"type": "bridge/error", "error": str(e)})
             
     def create_session(self) -> str:
@@ -95,9 +119,11 @@ class EnhancedBroker:
             raise KeyError("Unknown session")
         return self.sessions[sid]
         
-    async def route_from_client(self, session_id: str, payload: Dict[str, Any]) -> None:
+    async def route_from_client(self, session_id: str, payload: Dict[str, Any], ctx: Optional[RouteCtx] = None) -> None:
         """Route message from client with content filtering"""
         start_time = time.time()
+        if ctx is not None:
+            logger.debug("Routing from %s (priority=%s) for session %s", ctx.client_info, ctx.priority, session_id)
         
         try:
             # Map request ID to session
@@ -144,6 +170,8 @@ class EnhancedBroker:
         """Pump messages from server to clients with filtering"""
         while True:
             msg = await self.inbox.get()
+            # One clock read per upstream message, shared by every session it reaches
+            self.tick()
             try:
                 target_sid: Optional[str] = None
                 if "id" in msg and msg["id"] in self.id_to_session:
@@ -178,30 +206,24 @@ class EnhancedBroker:
             await self._send(session_id, msg)
             
     async def _send(self, session_id: str, obj: Any) -> None:
-        """Send message to session (enhanced version)"""
+        """Send message to session; obj is a dict or already-serialized JSON bytes"""
         if session_id not in self.sessions:
             return
             
         sess = self.sessions[session_id]
-        sess.last_beat = time.time()
+        sess.last_beat = self.now
+        payload = obj if isinstance(obj, bytes) else json.dumps(obj, ensure_ascii=False).encode("utf-8")
         
-        try:
-            # Format as proper MCP SSE message event
-            data = f"event: message\ndata: {json.dumps(obj, ensure_ascii=False)}\n\n".encode("utf-8")
-            await sess.queue.put(data)
-            
-            # Update session metrics
-            sess.filter_metrics["messages_sent"] = sess.filter_metrics.get("messages_sent", 0) + 1
-            
-        except asyncio.QueueFull:
-            logger.warning("Session %s SSE queue full; dropping message", session_id)
-            sess.filter_metrics["dropped_messages"] = sess.filter_metrics.get("dropped_messages", 0) + 1
+        # Format as proper MCP SSE message event
+        await sess.push(SSE_MESSAGE_PREFIX + payload + SSE_EVENT_END)
+        # Update session metrics
+        sess.filter_metrics["messages_sent"] = sess.filter_metrics.get("messages_sent", 0) + 1
             
         # Handle WebSocket connections
         dead: list[WebSocket] = []
         for ws in list(sess.websockets):
             try:
-                await ws.send_text(json.dumps(obj, ensure_ascii=False))
+                await ws.send_text(payload.decode("utf-8"))
             except Exception:
                 dead.append(ws)
                 
@@ -243,7 +265,7 @@ class EnhancedBroker:
         
         for session_id, session in self.sessions.items():
             sessions_info[session_id] = {
-                "queue_size": session.queue.qsize(),
+                "queue_size": len(session.frames),
                 "websocket_count": len(session.websockets),
                 "last_beat": session.last_beat,
                 "age_seconds": time.time() - session.created_at,
@@ -6,11 +6,13 @@ Enhanced version of simple_bridge.py with comprehensive content filtering and se
 
 import argparse
 import asyncio
+import hmac
 import json
 import logging
+import logging.handlers
 import os
+import queue
 import sys
-import time
 import uuid
 from typing import Any, AsyncGenerator, Dict, Optional, List, Union
 
@@ -22,12 +24,12 @@ try:
     from .sse_process import SSEProcess
     from .enhanced_broker import EnhancedBroker
     from .content_filters import ContentFilter, FilterConfig
-    from .models import FilterInfo
+    from .models import FilterInfo, RouteCtx
 except ImportError:
     from sse_process import SSEProcess
     from enhanced_broker import EnhancedBroker
     from content_filters import ContentFilter, FilterConfig
-    from models import FilterInfo
+    from models import FilterInfo, RouteCtx
 
 # ----------------------------- Logging ------------------------------------
 logger = logging.getLogger("filtered-bridge")
@@ -35,20 +37,39 @@ logger = logging.getLogger("filtered-bridge")
 # ----------------------------- Auth Configuration -------------------------
 AUTH_MODE = os.getenv("BRIDGE_AUTH_MODE", "none")  # none|bearer|apikey
 AUTH_SECRET = os.getenv("BRIDGE_AUTH_SECRET", "")
+AUTH_SECRET_BYTES = AUTH_SECRET.encode()
 
-def check_auth(authorization: Optional[str] = None, x_api_key: Optional[str] = None):
-    """Check authentication based on configured mode"""
-    if AUTH_MODE == "none":
-        return
-    if AUTH_MODE == "bearer":
-        if not authorization or not authorization.strip().lower().startswith("bearer "):
-            raise HTTPException(401, "Bearer token required")
-        token = authorization.split()[-1] if authorization else ""
-        if token != AUTH_SECRET:
-            raise HTTPException(401, "Invalid bearer token")
-    if AUTH_MODE == "apikey":
-        if x_api_key != AUTH_SECRET:
-            raise HTTPException(401, "Invalid API key")
+# Largest /messages body accepted before responding 413
+MAX_MESSAGE_BYTES = int(os.getenv("BRIDGE_MAX_MESSAGE_BYTES", str(4 * 1024 * 1024)))
+
+def _check_no_auth(authorization: Optional[str] = None, x_api_key: Optional[str] = None):
+    """Authentication disabled"""
+    return
+
+def _check_bearer(authorization: Optional[str] = None, x_api_key: Optional[str] = None):
+    """Require a matching bearer token"""
+    if not authorization or not authorization.strip().lower().startswith("bearer "):
+        raise HTTPException(401, "Bearer token required")
+    token = authorization.split()[-1]
+    if not hmac.compare_digest(token.encode(), AUTH_SECRET_BYTES):
+        raise HTTPException(401, "Invalid bearer token")
+
+def _check_apikey(authorization: Optional[str] = None, x_api_key: Optional[str] = None):
+    """Require a matching X-API-Key header"""
+    if x_api_key is None or not hmac.compare_digest(x_api_key.encode(), AUTH_SECRET_BYTES):
+        raise HTTPException(401, "Invalid API key")
+
+# Check authentication based on configured mode (resolved once at import)
+check_auth = {
+    "none": _check_no_auth,
+    "bearer": _check_bearer,
+    "apikey": _check_apikey,
+}.get(AUTH_MODE, _check_no_auth)
+
+# ----------------------------- Pre-encoded Frames -------------------------
+SSE_ENDPOINT_PREFIX = b"event: endpoint\ndata: "
+SSE_EVENT_END = b"\n\n"
+DISCOVERY_ID_PREFIX = b'{"jsonrpc": "2.0", "id": '
 
 # ----------------------------- FastAPI App --------------------------------
 app = FastAPI(
@@ -127,7 +148,7 @@ async def sse_events(request: Request,
             # Required: Send endpoint event first per MCP spec
             base_url = str(request.base_url).rstrip("/")
             endpoint_url = f"{base_url}/messages?session={session_id}"
-            yield f"event: endpoint\ndata: {endpoint_url}\n\n".encode()
+            yield SSE_ENDPOINT_PREFIX + endpoint_url.encode() + SSE_EVENT_END
             
             # Fall through to normal stream
             async for chunk in event_stream_generator(session_id):
@@ -148,17 +169,21 @@ async def event_stream_generator(session_id: str) -> AsyncGenerator[bytes, None]
     # Stream messages from broker
     while True:
         try:
-            # Wait for message with timeout for heartbeat (15s per spec)
+            # Drain frames; they are already formatted as SSE by the broker
+            while session.frames:
+                frame = session.frames.popleft()
+                session.drained.set()
+                yield frame
+            # Wait for the next frame with timeout for heartbeat (15s per spec)
+            session.wakeup.clear()
             try:
-                item = await asyncio.wait_for(session.queue.get(), timeout=15.0)
-                # Item should already be properly formatted as SSE by broker
-                yield item
-                session.queue.task_done()
+                await asyncio.wait_for(session.wakeup.wait(), timeout=15.0)
+                # Woken by a queued frame; whoever queued it refreshed the clock first
+                session.last_beat = broker.now
             except asyncio.TimeoutError:
                 # Send heartbeat comment per MCP spec
                 yield b": heartbeat\n\n"
-                
-            session.last_beat = time.time()
+                session.last_beat = broker.tick()
                 
         except asyncio.CancelledError:
             break
@@ -166,6 +191,19 @@ async def event_stream_generator(session_id: str) -> AsyncGenerator[bytes, None]
             logger.error(f"Error in SSE stream for session {session_id}: {e}")
             break
 
+async def read_message_body(request: Request) -> bytearray:
+    """Read the request body into one buffer, rejecting bodies over MAX_MESSAGE_BYTES"""
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > MAX_MESSAGE_BYTES:
+        raise HTTPException(413, "Message too large")
+    
+    raw = bytearray()
+    async for chunk in request.stream():
+        raw.extend(chunk)
+        if len(raw) > MAX_MESSAGE_BYTES:
+            raise HTTPException(413, "Message too large")
+    return raw
+
 @app.post("/messages")
 async def send_message(request: Request,
                       authorization: Optional[str] = Header(default=None),
@@ -177,25 +215,33 @@ async def send_message(request: Request,
     if not broker:
         raise HTTPException(503, "Bridge not ready")
     
+    # Refresh the clock before any branch below queues a frame; _send stamps last_beat from it
+    now = broker.tick()
+    
     # Log request details
     client_info = f"{request.client.host}:{request.client.port}" if request.client else "unknown"
     priority = request.query_params.get("priority", "normal")
     
+    raw_body = await read_message_body(request)
     try:
-        payload = await request.json()
+        payload = json.loads(raw_body)
         message_id = payload.get("id", "no-id")
         method = payload.get("method", "no-method")
         
         logger.info(f"Received message from {client_info}: {method} (id: {message_id}, priority: {priority})")
-        logger.debug(f"Full message payload: {json.dumps(payload, indent=2)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Full message payload: %s", json.dumps(payload, indent=2))
     except Exception as e:
         logger.error(f"Failed to parse JSON from {client_info}: {e}")
         raise HTTPException(400, "Invalid JSON")
     
+    # Resolve the target session with a single lookup
+    session_id = request.query_params.get("session")
+    session = broker.sessions.get(session_id) if session_id else None
+    
     # Handle MCP initialize request specially (bridge-level response + forward to server)
     if payload.get("method") == "initialize":
-        session_id = request.query_params.get("session")
-        if not session_id or session_id not in broker.sessions:
+        if session is None:
             raise HTTPException(400, "Valid session required for initialize")
             
         # 1) Send immediate bridge-level response to Claude Code
@@ -232,10 +278,9 @@ async def send_message(request: Request,
         return JSONResponse({"status": "accepted"}, status_code=202)
     
     # Handle discovery requests at bridge level
-    discovery_methods = ["tools/list", "resources/list", "prompts/list"]
-    if payload.get("method") in discovery_methods:
-        session_id = request.query_params.get("session")
-        if not session_id or session_id not in broker.sessions:
+    discovery_templates = get_discovery_templates()
+    if payload.get("method") in discovery_templates:
+        if session is None:
             raise HTTPException(400, "Valid session required for discovery")
             
         method = payload.get("method")
@@ -243,38 +288,11 @@ async def send_message(request: Request,
         
         logger.info(f"Handling bridge-level discovery: {method} (id: {request_id})")
         
-        if method == "tools/list":
-            # Return available tools from upstream server configuration
-            tools_response = {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {"tools": getattr(app.state, 'upstream_tools', [])}
-            }
-        elif method == "resources/list":
-            resources_response = {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {"resources": []}
-            }
-            await broker._send(session_id, resources_response)
-            logger.info(f"Sent bridge resources/list response (id: {request_id}) to session {session_id}")
-            return JSONResponse({"status": "accepted"}, status_code=202)
-            
-        elif method == "prompts/list":
-            prompts_response = {
-                "jsonrpc": "2.0",
-                "id": request_id,
-                "result": {"prompts": []}
-            }
-            await broker._send(session_id, prompts_response)
-            logger.info(f"Sent bridge prompts/list response (id: {request_id}) to session {session_id}")
-            return JSONResponse({"status": "accepted"}, status_code=202)
-        
-        # Send tools response if we got here
-        if method == "tools/list":
-            await broker._send(session_id, tools_response)
-            logger.info(f"Sent bridge tools/list response (id: {request_id}) to session {session_id}")
-            return JSONResponse({"status": "accepted"}, status_code=202)
+        # Only the id differs between responses; the result is pre-serialized
+        discovery_response = DISCOVERY_ID_PREFIX + json.dumps(request_id).encode() + discovery_templates[method]
+        await broker._send(session_id, discovery_response)
+        logger.info(f"Sent bridge {method} response (id: {request_id}) to session {session_id}")
+        return JSONResponse({"status": "accepted"}, status_code=202)
     
     # Ensure message has required JSON-RPC fields
     if isinstance(payload, dict) and "jsonrpc" not in payload:
@@ -282,25 +300,18 @@ async def send_message(request: Request,
     if "id" not in payload and payload.get("method"):
         payload["id"] = str(uuid.uuid4())
     
-    # Get session ID
-    session_id = request.query_params.get("session")
-    
     # Fallback: single open session
     if not session_id and len(broker.sessions) == 1:
-        session_id = next(iter(broker.sessions.keys()))
+        session_id, session = next(iter(broker.sessions.items()))
     
-    if not session_id or session_id not in broker.sessions:
+    if session is None:
         raise HTTPException(400, "No valid session (pass ?session=..., or open exactly one SSE stream)")
     
-    # Add priority metadata to the payload for broker processing
-    if "meta" not in payload:
-        payload["meta"] = {}
-    payload["meta"]["priority"] = priority
-    payload["meta"]["client_info"] = client_info
-    payload["meta"]["timestamp"] = time.time()
+    # Routing metadata travels beside the payload so the message sent upstream is untouched
+    ctx = RouteCtx(priority, client_info, now)
     
-    logger.debug(f"Routing message {message_id} to session {session_id} with content filtering")
-    await broker.route_from_client(session_id, payload)
+    logger.debug("Routing message %s to session %s with content filtering", message_id, session_id)
+    await broker.route_from_client(session_id, payload, ctx)
     
     # Per MCP spec: return 202 Accepted for messages (responses come via SSE)
     return JSONResponse({"status": "accepted"}, status_code=202)
@@ -367,6 +378,26 @@ async def get_filter_metrics():
 
 # ----------------------------- Utility Functions -------------------------
 
+def build_discovery_templates(upstream_tools: List[Dict[str, Any]]) -> Dict[str, bytes]:
+    """Pre-serialize the bridge-level discovery responses after their id field"""
+    results = {
+        "tools/list": {"tools": upstream_tools},
+        "resources/list": {"resources": []},
+        "prompts/list": {"prompts": []},
+    }
+    return {
+        method: b', "result": ' + json.dumps(result, ensure_ascii=False).encode("utf-8") + b"}"
+        for method, result in results.items()
+    }
+
+def get_discovery_templates() -> Dict[str, bytes]:
+    """Return the cached discovery responses, building them on first use"""
+    templates = getattr(app.state, 'discovery_templates', None)
+    if templates is None:
+        templates = build_discovery_templates(getattr(app.state, 'upstream_tools', []))
+        app.state.discovery_templates = templates
+    return templates
+
 def load_filter_config(config_path: Optional[str]) -> FilterConfig:
     """Load filter configuration from JSON file"""
     if not config_path or not os.path.exists(config_path):
@@ -383,17 +414,19 @@ def load_filter_config(config_path: Optional[str]) -> FilterConfig:
         return FilterConfig()
 
 def setup_logging(log_level: str, log_location: Optional[str] = None, log_pattern: str = "filtered_bridge_{port}.log", 
-                 port: int = 8201):
-    """Configure logging based on arguments"""
+                 port: int = 8201) -> logging.handlers.QueueListener:
+    """Configure logging based on arguments; returns the started queue listener"""
     logger.handlers.clear()  # Remove any existing handlers
+    handlers: List[logging.Handler] = []
     
     # Console handler
     console_handler = logging.StreamHandler(sys.stderr)
     console_formatter = logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s")
     console_handler.setFormatter(console_formatter)
-    logger.addHandler(console_handler)
+    handlers.append(console_handler)
     
     # File handler if log_location specified
+    log_path = None
     if log_location:
         os.makedirs(log_location, exist_ok=True)
         
@@ -404,15 +437,24 @@ def setup_logging(log_level: str, log_location: Optional[str] = None, log_patter
             date=datetime.now().strftime("%Y%m%d")
         )
         
-        file_handler = logging.FileHandler(os.path.join(log_location, log_filename))
+        log_path = os.path.join(log_location, log_filename)
+        file_handler = logging.FileHandler(log_path)
         file_formatter = logging.Formatter("%(asctime)s %(levelname)s [%(name)s] %(message)s")
         file_handler.setFormatter(file_formatter)
-        logger.addHandler(file_handler)
-        
-        logger.info(f"Logging to file: {os.path.join(log_location, log_filename)}")
+        handlers.append(file_handler)
+    
+    # Stream/file writes happen on the listener thread, never inside the event loop
+    log_queue: queue.Queue = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
     
     # Set level
     logger.setLevel(getattr(logging, log_level.upper()))
+    
+    if log_path:
+        logger.info(f"Logging to file: {log_path}")
+    return listener
 
 async def test_sse_server_health(sse_url: str, api_key: Optional[str] = None) -> bool:
     """Test if the upstream SSE MCP server is responding properly"""
@@ -437,11 +479,8 @@ async def test_sse_server_health(sse_url: str, api_key: Optional[str] = None) ->
                 }
             }
             
-            await test_proc.write_json(test_init)
-            logger.debug("Sent health check initialize request to SSE server")
-            
-            # Wait for response with timeout
-            response = await asyncio.wait_for(test_proc.read_json(), timeout=10.0)
+            # Wait for the matching response; other upstream traffic stays queued
+            response = await test_proc.request(test_init, timeout=10.0)
             
             if response.get("id") == "health-check" and "result" in response:
                 logger.info("✓ SSE server health check passed - server is responsive")
@@ -491,11 +530,13 @@ def main():
     parser.add_argument("--log_level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="Logging level")
     parser.add_argument("--log_location", help="Directory for log files (optional)")
     parser.add_argument("--log_pattern", default="filtered_bridge_{port}.log", help="Log filename pattern")
+    parser.add_argument("--loop", default="auto", choices=["auto", "asyncio", "uvloop"], help="Event loop implementation (auto picks uvloop when installed)")
+    parser.add_argument("--http", default="auto", choices=["auto", "h11", "httptools"], help="HTTP parser (auto picks httptools when installed)")
     
     args = parser.parse_args()
     
     # Setup logging first
-    setup_logging(args.log_level, args.log_location, args.log_pattern, args.port)
+    app.state.log_listener = setup_logging(args.log_level, args.log_location, args.log_pattern, args.port)
     
     # Load filter configuration
     filter_config = load_filter_config(args.filter_config)
@@ -503,17 +544,24 @@ def main():
     # Store configuration in app state
     app.state.config = args
     app.state.filter_config = filter_config
+    app.state.discovery_templates = build_discovery_templates(getattr(app.state, 'upstream_tools', []))
     
     # Initialize broker on startup
     @app.on_event("startup")
     async def startup():
         await init_broker(args.sse_url, args.api_key, filter_config)
     
+    # Flush queued log records on exit
+    @app.on_event("shutdown")
+    async def shutdown():
+        app.state.log_listener.stop()
+    
     logger.info(f"Starting Filtered SSE-to-SSE MCP Bridge on {args.host}:{args.port}")
     logger.info(f"Auth mode: {AUTH_MODE}")
     logger.info(f"Upstream SSE URL: {args.sse_url}")
     logger.info(f"Log level: {args.log_level}")
     logger.info(f"Content filtering: Enabled")
+    logger.info(f"Event loop: {args.loop}, HTTP parser: {args.http}")
     if args.log_location:
         logger.info(f"Log location: {args.log_location}")
     
@@ -521,7 +569,9 @@ def main():
         app,
         host=args.host,
         port=args.port,
-        log_level="info"
+        log_level="info",
+        loop=args.loop,
+        http=args.http
     )
 
 if __name__ == "__main__":
@@ -1,6 +1,10 @@
+import sys
 from pydantic import BaseModel, Field
 from typing import Optional, List, Any, Dict
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+# slots=True is only accepted by dataclass() on Python 3.10+
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
 
 class SessionOut(BaseModel):
     session: str
@@ -12,18 +16,21 @@ class PostAccepted(BaseModel):
 class ToggleFilterIn(BaseModel):
     enabled: bool
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class FilterInfo:
     """Information about filtering actions taken on a message"""
     blocked: bool = False
     block_reason: Optional[str] = None
-    actions_taken: List[str] = None
+    actions_taken: List[str] = field(default_factory=list)
     pii_redacted: bool = False
     security_violation: bool = False
     modified_content: bool = False
     original_size: int = 0
     filtered_size: int = 0
-    
-    def __post_init__(self):
-        if self.actions_taken is None:
-            self.actions_taken = []
+
+@dataclass(**DATACLASS_SLOTS)
+class RouteCtx:
+    """Per-request routing context passed alongside (not inside) a client message"""
+    priority: str = "normal"
+    client_info: str = "unknown"
+    timestamp: float = 0.0
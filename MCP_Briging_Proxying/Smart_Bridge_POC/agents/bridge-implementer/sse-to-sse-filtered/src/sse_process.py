@@ -10,7 +10,7 @@ import logging
 import time
 from typing import Any, Dict, Optional, AsyncGenerator
 import aiohttp
-from urllib.parse import urljoin, urlparse
+from urllib.parse import parse_qs, urljoin, urlparse
 
 logger = logging.getLogger("sse-process")
 
@@ -25,10 +25,14 @@ class SSEProcess:
         self.api_key = api_key
         self.session: Optional[aiohttp.ClientSession] = None
         self.sse_reader_task: Optional[asyncio.Task] = None
+        self.sse_parser_task: Optional[asyncio.Task] = None
         self.sse_response: Optional[aiohttp.ClientResponse] = None
         self.message_endpoint: str = ""
         self.session_id: Optional[str] = None
+        # Raw (event, data) frames from the reader; bounded so a slow parser throttles the socket read
+        self.frame_queue: asyncio.Queue = asyncio.Queue(maxsize=32)
         self.message_queue: asyncio.Queue[Dict[str, Any]] = asyncio.Queue()
+        self._pending: Dict[Any, asyncio.Future] = {}  # JSON-RPC id → response future
         self.running = False
         self.headers = {}
         
@@ -64,6 +68,7 @@ class SSEProcess:
             # Start reading SSE events
             self.running = True
             self.sse_reader_task = asyncio.create_task(self._sse_reader_loop())
+            self.sse_parser_task = asyncio.create_task(self._sse_parser_loop())
             
             # Wait for endpoint event to get message URL
             await self._wait_for_endpoint()
@@ -84,8 +89,8 @@ class SSEProcess:
                     self.message_endpoint = message.get("data", "")
                     logger.info(f"Received endpoint: {self.message_endpoint}")
                     # Extract session ID from endpoint URL
-                    if "session=" in self.message_endpoint:
-                        self.session_id = self.message_endpoint.split("session=")[1].split("&")[0]
+                    query = parse_qs(urlparse(self.message_endpoint).query)
+                    self.session_id = query.get("session", [None])[0]
                     return
                 else:
                     # Put non-endpoint message back for normal processing
@@ -96,7 +101,8 @@ class SSEProcess:
         raise Exception("Timeout waiting for SSE endpoint event")
         
     async def _sse_reader_loop(self):
-        """Read SSE events from upstream server"""
+        """Read raw SSE events from upstream server (stage 1: network read)"""
+        event_type = None
         try:
             async for line in self.sse_response.content:
                 if not self.running:
@@ -106,38 +112,57 @@ class SSEProcess:
                 if not line_str:
                     continue
                     
-                # Parse SSE event format
+                # Split SSE event format; JSON parsing happens in the parser stage
                 if line_str.startswith("event: "):
                     event_type = line_str[7:]
                 elif line_str.startswith("data: "):
-                    data = line_str[6:]
-                    
-                    if event_type == "endpoint":
-                        # Special handling for endpoint events
-                        await self.message_queue.put({"event": "endpoint", "data": data})
-                    elif event_type == "message":
-                        # Parse JSON message data
-                        try:
-                            message_data = json.loads(data)
-                            await self.message_queue.put(message_data)
-                        except json.JSONDecodeError as e:
-                            logger.warning(f"Failed to parse SSE message: {e}")
+                    await self.frame_queue.put((event_type, line_str[6:]))
                 elif line_str.startswith(": "):
                     # SSE comment/heartbeat - ignore
                     continue
                     
         except Exception as e:
             logger.error(f"SSE reader loop error: {e}")
-        finally:
-            logger.info("SSE reader loop ended")
+        # Reached on EOF or error; cleanup() cancels both stages, so no sentinel is needed then.
+        # Waits for room: a dropped sentinel would leave the parser blocked forever
+        await self.frame_queue.put(None)
+        logger.info("SSE reader loop ended")
+            
+    async def _sse_parser_loop(self):
+        """Parse SSE event data and dispatch messages (stage 2: parse + dispatch)"""
+        while True:
+            frame = await self.frame_queue.get()
+            if frame is None:
+                break
+            event_type, data = frame
             
+            if event_type == "endpoint":
+                # Special handling for endpoint events
+                await self.message_queue.put({"event": "endpoint", "data": data})
+            elif event_type == "message":
+                # Parse JSON message data
+                try:
+                    message_data = json.loads(data)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Failed to parse SSE message: {e}")
+                    continue
+                # Responses to request() go straight to their waiter; only str/int ids can be
+                # pending, and an unhashable id (list, object) must not kill the parser
+                msg_id = message_data.get("id") if isinstance(message_data, dict) else None
+                fut = self._pending.pop(msg_id, None) if isinstance(msg_id, (str, int)) else None
+                if fut is not None:
+                    if not fut.done():
+                        fut.set_result(message_data)
+                    continue
+                await self.message_queue.put(message_data)
+                
     async def read_json(self) -> Dict[str, Any]:
         """Read next JSON message from upstream server (compatible with StdioProcess)"""
         if not self.running:
             raise Exception("SSE process not running")
             
         message = await self.message_queue.get()
-        logger.debug(f"Read message: {message}")
+        logger.debug("Read message: %s", message)
         return message
         
     async def write_json(self, obj: Dict[str, Any]):
@@ -146,7 +171,7 @@ class SSEProcess:
             raise Exception("SSE process not ready for writing")
             
         try:
-            logger.debug(f"Sending message: {obj}")
+            logger.debug("Sending message: %s", obj)
             
             # Send to message endpoint
             async with self.session.post(
@@ -161,19 +186,37 @@ class SSEProcess:
             logger.error(f"Failed to send message: {e}")
             raise
             
+    async def request(self, obj: Dict[str, Any], timeout: float = 30.0) -> Dict[str, Any]:
+        """Send a JSON-RPC request and wait for its response (bypasses message_queue)"""
+        request_id = obj.get("id")
+        if request_id is None:
+            raise ValueError("request() requires a JSON-RPC id")
+
+        fut = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = fut
+        try:
+            await self.write_json(obj)
+            return await asyncio.wait_for(fut, timeout=timeout)
+        finally:
+            self._pending.pop(request_id, None)
+            
     async def cleanup(self):
         """Clean up SSE connection"""
         logger.info("Cleaning up SSE connection")
         self.running = False
         
-        if self.sse_reader_task:
-            self.sse_reader_task.cancel()
-            try:
-                await self.sse_reader_task
-            except asyncio.CancelledError:
-                pass
+        for fut in self._pending.values():
+            fut.cancel()
+        self._pending.clear()
+        
+        tasks = [t for t in (self.sse_reader_task, self.sse_parser_task) if t]
+        for task in tasks:
+            task.cancel()
+        # Wait for both loops together; cancellation and late errors are not re-raised
+        await asyncio.gather(*tasks, return_exceptions=True)
                 
         if self.sse_response:
+            # The stream never reaches EOF, so close rather than release to the pool
             self.sse_response.close()
             
         if self.session:
@@ -5,20 +5,65 @@ Verifies it follows the working simple_bridge.py architecture correctly
 """
 
 import asyncio
+import atexit
+import functools
 import json
+import os
+import re
 import subprocess
 import sys
+import threading
 import time
 import requests
+from requests.adapters import HTTPAdapter
 from typing import Dict, Any
 
+# Bridge modules live next to this script and in src/; set the path up once
+BRIDGE_DIR = os.path.dirname(os.path.abspath(__file__))
+for _path in (os.path.join(BRIDGE_DIR, "src"), BRIDGE_DIR):
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+# Pooled sessions keep localhost connections alive; requests.Session is not
+# thread-safe and the probes run in executor threads, so each thread gets its own
+_LOCAL = threading.local()
+_SESSIONS = []
+
+def _session() -> requests.Session:
+    """Return the calling thread's pooled session, creating it on first use"""
+    session = getattr(_LOCAL, "session", None)
+    if session is None:
+        session = _LOCAL.session = requests.Session()
+        session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        _SESSIONS.append(session)
+    return session
+
+@atexit.register
+def _close_sessions():
+    for session in _SESSIONS:
+        session.close()
+
+# Endpoint event announced on the SSE stream, matched on raw bytes
+_SSE_ENDPOINT_RE = re.compile(
+    rb"event: endpoint\r?\ndata:\s*(?P<url>[^\r\n]*/messages\?session=(?P<sid>[A-Za-z0-9_\-]+))"
+)
+
+@functools.lru_cache(maxsize=1)
+def _health_probe(epoch_second: int):
+    """Fetch /health; the cache entry is keyed by wall-clock second"""
+    response = _session().get("http://localhost:8202/health", timeout=5)
+    return response.status_code, (response.json() if response.status_code == 200 else None)
+
+def _cached_health():
+    """Return (status_code, body) for /health, reusing a probe from the same second"""
+    return _health_probe(int(time.time()))
+
 def test_bridge_startup():
     """Test that the corrected bridge starts up without errors"""
     print("🧪 Testing corrected filtered bridge startup...")
     
     # Test basic import
     try:
-        sys.path.insert(0, '/media/alex/LargeStorage/Projects/MCP_Testing_Tools/MCP_Briging_Proxying/Smart_Bridge_POC/agents/bridge-implementer/sse-to-sse-filtered')
         from filtered_simple_bridge import FilteredBroker, FilterConfig
         from content_filters import ContentFilter
         from models import FilterInfo
@@ -48,18 +93,48 @@ def test_bridge_startup():
     print("✅ Bridge startup test passed")
     return True
 
+async def check_app_in_process():
+    """Exercise the bridge app routes in-process through httpx's ASGI transport"""
+    print("\n🧪 Testing bridge app in-process...")
+    
+    try:
+        import httpx
+        from filtered_simple_bridge import app
+    except ImportError as e:
+        print(f"⚠️  In-process test skipped: {e}")
+        return True
+    
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # No upstream is started here, so the bridge reports itself as initializing
+            response = await client.get("/health")
+            if response.status_code != 200 or "status" not in response.json():
+                print(f"❌ In-process health error: {response.status_code}")
+                return False
+            print(f"✅ In-process health responding: {response.json()['status']}")
+            
+            response = await client.get("/sse")
+            if response.status_code != 503:
+                print(f"❌ In-process SSE without broker returned {response.status_code}, expected 503")
+                return False
+            print("✅ In-process SSE rejects connections until the broker is ready")
+        return True
+    except Exception as e:
+        print(f"❌ In-process test failed: {e}")
+        return False
+
 def test_health_endpoint():
     """Test that health endpoint responds correctly"""
     print("\n🧪 Testing health endpoint...")
     
     try:
-        response = requests.get("http://localhost:8202/health", timeout=5)
-        if response.status_code == 200:
-            health_data = response.json()
+        status_code, health_data = _cached_health()
+        if status_code == 200:
             print(f"✅ Health endpoint responding: {health_data}")
             return True
         else:
-            print(f"❌ Health endpoint error: {response.status_code}")
+            print(f"❌ Health endpoint error: {status_code}")
             return False
     except Exception as e:
         print(f"❌ Health endpoint failed: {e}")
@@ -70,20 +145,26 @@ def test_sse_endpoint():
     print("\n🧪 Testing SSE endpoint format...")
     
     try:
-        response = requests.get("http://localhost:8202/sse", stream=True, timeout=10)
+        response = _session().get("http://localhost:8202/sse", stream=True, timeout=10)
         
-        # Read first few chunks to find endpoint event
-        for i, chunk in enumerate(response.iter_content(chunk_size=1024)):
-            if i > 5:  # Only read first few chunks
-                break
+        try:
+            # Read raw bytes as they arrive (read1 needs urllib3 2.x) until the endpoint event shows up
+            response.raw.decode_content = False
+            buf = bytearray()
+            while len(buf) <= 65536:
+                chunk = response.raw.read1(4096)
+                if not chunk:
+                    break
+                    
+                print(f"SSE chunk: {chunk[:200]!r}")
+                buf += chunk
                 
-            decoded = chunk.decode('utf-8', errors='ignore')
-            print(f"SSE chunk {i}: {repr(decoded[:200])}")
-            
-            # Look for endpoint event with correct format
-            if "event: endpoint" in decoded and "/messages?session=" in decoded:
-                print("✅ SSE endpoint format is correct (uses ?session=)")
-                return True
+                # Look for endpoint event with correct format
+                if _SSE_ENDPOINT_RE.search(buf):
+                    print("✅ SSE endpoint format is correct (uses ?session=)")
+                    return True
+        finally:
+            response.close()
         
         print("❌ SSE endpoint format test failed - correct endpoint event not found")
         return False
@@ -92,6 +173,16 @@ def test_sse_endpoint():
         print(f"❌ SSE endpoint test failed: {e}")
         return False
 
+async def _run_probes():
+    """Run the independent probes concurrently; blocking ones go to the default executor"""
+    loop = asyncio.get_running_loop()
+    return await asyncio.gather(
+        check_app_in_process(),
+        loop.run_in_executor(None, test_health_endpoint),
+        loop.run_in_executor(None, test_sse_endpoint),
+        return_exceptions=True,
+    )
+
 def test_corrected_implementation():
     """Run comprehensive tests on the corrected implementation"""
     print("🔧 Testing Corrected Filtered Bridge Implementation")
@@ -103,12 +194,19 @@ def test_corrected_implementation():
     if not test_bridge_startup():
         all_passed = False
     
-    # Test 2: Health endpoint (if bridge is running)
-    if not test_health_endpoint():
+    # Tests 2-4 hit independent endpoints, so they run together
+    in_process_ok, health_ok, sse_ok = asyncio.run(_run_probes())
+    
+    # Test 2: App routes in-process (no running bridge needed)
+    if in_process_ok is not True:
+        all_passed = False
+    
+    # Test 3: Health endpoint (if bridge is running)
+    if health_ok is not True:
         print("⚠️  Health endpoint not responding - bridge may not be running")
     
-    # Test 3: SSE endpoint format (if bridge is running)
-    if not test_sse_endpoint():
+    # Test 4: SSE endpoint format (if bridge is running)
+    if sse_ok is not True:
         print("⚠️  SSE endpoint test failed - bridge may not be running")
     
     print("\n" + "=" * 60)
@@ -4,11 +4,40 @@ Test actual MCP message flow through the corrected filtered bridge
 """
 
 import json
-import requests
+import re
 import time
 import asyncio
 import aiohttp
 
+# Endpoint event announced on the SSE stream, matched on raw bytes
+_SSE_ENDPOINT_RE = re.compile(
+    rb"event: endpoint\r?\ndata:\s*(?P<url>[^\r\n]*/messages\?session=(?P<sid>[A-Za-z0-9_\-]+))"
+)
+
+# Request bodies are encoded once and posted as raw bytes
+_JSON_HEADERS = {"Content-Type": "application/json"}
+_INIT_BODY = json.dumps({
+    "jsonrpc": "2.0",
+    "id": "test-init-1",
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {},
+        "clientInfo": {"name": "Test Client", "version": "1.0.0"}
+    }
+}).encode("utf-8")
+_TOOLS_BODY = json.dumps({
+    "jsonrpc": "2.0",
+    "id": "test-tools-1",
+    "method": "tools/list",
+    "params": {}
+}).encode("utf-8")
+
+def _client_session() -> aiohttp.ClientSession:
+    """One pooled client for every request in a run; SSE reads are not capped by a total timeout"""
+    connector = aiohttp.TCPConnector(limit=64, ttl_dns_cache=300, force_close=False, enable_cleanup_closed=True)
+    return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=None, connect=5))
+
 async def test_mcp_message_flow():
     """Test a complete MCP message flow through the filtered bridge"""
     print("🧪 Testing MCP Message Flow Through Corrected Bridge")
@@ -17,93 +46,76 @@ async def test_mcp_message_flow():
     base_url = "http://localhost:8202"
     
     try:
-        # Step 1: Get SSE connection and extract session
-        print("1️⃣ Connecting to SSE endpoint...")
-        response = requests.get(f"{base_url}/sse", stream=True, timeout=5)
-        
-        # Read first chunk to get endpoint event
-        first_chunk = next(response.iter_content(chunk_size=1024))
-        sse_data = first_chunk.decode('utf-8')
-        
-        # Extract session ID from endpoint URL
-        session_id = None
-        for line in sse_data.split('\n'):
-            if line.startswith('data: ') and 'session=' in line:
-                endpoint_url = line[6:]  # Remove 'data: '
-                session_id = endpoint_url.split('session=')[1]
-                break
-        
-        if not session_id:
-            print("❌ Failed to extract session ID from SSE response")
-            return False
+        async with _client_session() as session:
+            # Step 1: Get SSE connection and extract session
+            print("1️⃣ Connecting to SSE endpoint...")
+            # The stream stays open for the whole flow so the bridge keeps the session alive;
+            # closing the ClientSession below tears it down on every exit path
+            sse = await session.get(f"{base_url}/sse", headers={"Connection": "keep-alive"})
+            # Read exactly the first event (the endpoint event)
+            first_event = await asyncio.wait_for(sse.content.readuntil(b"\n\n"), timeout=5.0)
             
-        print(f"✅ Got session ID: {session_id}")
-        response.close()  # Close SSE connection
-        
-        # Step 2: Send initialize message
-        print("2️⃣ Sending MCP initialize message...")
-        init_message = {
-            "jsonrpc": "2.0",
-            "id": "test-init-1",
-            "method": "initialize",
-            "params": {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {},
-                "clientInfo": {"name": "Test Client", "version": "1.0.0"}
-            }
-        }
-        
-        response = requests.post(
-            f"{base_url}/messages?session={session_id}",
-            json=init_message,
-            timeout=10
-        )
-        
-        if response.status_code == 202:
-            print("✅ Initialize message accepted")
-        else:
-            print(f"❌ Initialize message failed: {response.status_code}")
-            return False
-        
-        # Step 3: Send tools/list request
-        print("3️⃣ Sending tools/list request...")
-        tools_message = {
-            "jsonrpc": "2.0",
-            "id": "test-tools-1",
-            "method": "tools/list",
-            "params": {}
-        }
-        
-        response = requests.post(
-            f"{base_url}/messages?session={session_id}",
-            json=tools_message,
-            timeout=10
-        )
-        
-        if response.status_code == 202:
-            print("✅ Tools list request accepted")
-        else:
-            print(f"❌ Tools list request failed: {response.status_code}")
-            return False
-        
-        # Step 4: Test content filtering endpoint
-        print("4️⃣ Testing content filtering endpoints...")
-        
-        # Check filter status
-        response = requests.get(f"{base_url}/filters", timeout=5)
-        if response.status_code == 200:
-            filter_info = response.json()
-            print(f"✅ Filter status: {filter_info.get('status', 'unknown')}")
-        else:
-            print(f"❌ Filter status check failed: {response.status_code}")
-        
-        # Check filter metrics
-        response = requests.get(f"{base_url}/filters/metrics", timeout=5)
-        if response.status_code == 200:
-            metrics = response.json()
-            print(f"✅ Filter metrics retrieved: {len(metrics)} entries")
-        else:
-            print(f"❌ Filter metrics check failed: {response.status_code}")
+            # Extract session ID from endpoint URL
+            match = _SSE_ENDPOINT_RE.search(first_event)
+            session_id = match.group("sid").decode("ascii") if match else None
+            
+            if not session_id:
+                print("❌ Failed to extract session ID from SSE response")
+                return False
+                
+            print(f"✅ Got session ID: {session_id}")
+            
+            message_url = f"{base_url}/messages?session={session_id}"
+            timeout = aiohttp.ClientTimeout(total=10)
+            
+            # Step 2: Send initialize message
+            print("2️⃣ Sending MCP initialize message...")
+            async with session.post(message_url, data=_INIT_BODY, headers=_JSON_HEADERS, timeout=timeout) as response:
+                if response.status == 202:
+                    print("✅ Initialize message accepted")
+                else:
+                    print(f"❌ Initialize message failed: {response.status}")
+                    return False
+            
+            # Steps 3-4 only need the session id, so they are sent concurrently
+            print("3️⃣ Sending tools/list request...")
+            print("4️⃣ Testing content filtering endpoints...")
+            
+            async def post_status(body):
+                async with session.post(message_url, data=body, headers=_JSON_HEADERS, timeout=timeout) as resp:
+                    return resp.status, None
+            
+            async def fetch_json(path):
+                async with session.get(f"{base_url}{path}", timeout=aiohttp.ClientTimeout(total=5)) as resp:
+                    return resp.status, (await resp.json() if resp.status == 200 else None)
+            
+            results = await asyncio.gather(
+                post_status(_TOOLS_BODY),
+                fetch_json("/filters"),
+                fetch_json("/filters/metrics"),
+                return_exceptions=True,
+            )
+            statuses = [r if isinstance(r, Exception) else r[0] for r in results]
+            
+            if statuses[0] == 202:
+                print("✅ Tools list request accepted")
+            else:
+                print(f"❌ Tools list request failed: {statuses[0]}")
+                return False
+            
+            # Check filter status
+            if statuses[1] == 200:
+                print(f"✅ Filter status: {results[1][1].get('status', 'unknown')}")
+            else:
+                print(f"❌ Filter status check failed: {statuses[1]}")
+            
+            # Check filter metrics
+            if statuses[2] == 200:
+                print(f"✅ Filter metrics retrieved: {len(results[2][1])} entries")
+            else:
+                print(f"❌ Filter metrics check failed: {statuses[2]}")
+            
+            sse.close()
         
         print("\n" + "=" * 60)
         print("✅ MCP MESSAGE FLOW TEST COMPLETED SUCCESSFULLY")
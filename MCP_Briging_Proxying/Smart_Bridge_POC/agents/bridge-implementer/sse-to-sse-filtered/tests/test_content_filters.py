@@ -7,21 +7,39 @@ Tests all filtering scenarios: blacklist, sanitization, PII redaction, response
 import asyncio
 import json
 import pytest
+import re
 import sys
 import os
+from dataclasses import replace
 
 # Add src to path for imports
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from content_filters import ContentFilter, FilterConfig
 
+# Content well past the size-management thresholds, built once at import
+_LONG_CONTENT = "This is a very long piece of content. " * 50
+_LONG_MSG = {"jsonrpc": "2.0", "result": {"content": _LONG_CONTENT}}
+
+@pytest.fixture
+def size_filter():
+    """Filter configured for response size management"""
+    return ContentFilter(FilterConfig(max_response_length=100, summarize_threshold=50))
+
 class TestContentFilters:
     """Test content filtering functionality"""
     
-    def setup_method(self):
-        """Set up test environment"""
-        self.default_config = FilterConfig()
-        self.content_filter = ContentFilter(self.default_config)
+    # One regex pass per check instead of a substring scan per needle
+    _HTML_BANNED = re.compile(r"<script>|alert|onclick")
+    _PII_PRESENT = re.compile(r"\[(EMAIL|PHONE|SSN|CREDIT_CARD)_REDACTED\]")
+    _PII_LEAKS = re.compile(
+        r"john\.doe@example\.com|\(555\) 123-4567|123-45-6789|4111-1111-1111-1111"
+    )
+    
+    @pytest.fixture
+    def default_filter(self):
+        """Fresh filter with the default config; filters carry cache and metrics state"""
+        return ContentFilter(FilterConfig())
         
     @pytest.mark.asyncio
     async def test_blacklist_domain_filtering(self):
@@ -131,9 +149,7 @@ class TestContentFilters:
         
         assert result is not None
         content = result["result"]["content"]
-        assert "<script>" not in content
-        assert "alert" not in content
-        assert "onclick" not in content
+        assert not self._HTML_BANNED.search(content)
         
     @pytest.mark.asyncio
     async def test_pii_redaction(self):
@@ -167,44 +183,24 @@ class TestContentFilters:
         
         assert result is not None
         content = result["result"]["content"]
-        assert "[EMAIL_REDACTED]" in content
-        assert "[PHONE_REDACTED]" in content
-        assert "[SSN_REDACTED]" in content
-        assert "[CREDIT_CARD_REDACTED]" in content
-        assert "john.doe@example.com" not in content
-        assert "(555) 123-4567" not in content
-        assert "123-45-6789" not in content
-        assert "4111-1111-1111-1111" not in content
+        redacted = {m.group(1) for m in self._PII_PRESENT.finditer(content)}
+        assert redacted == {"EMAIL", "PHONE", "SSN", "CREDIT_CARD"}
+        assert not self._PII_LEAKS.search(content)
         
     @pytest.mark.asyncio
-    async def test_response_size_management(self):
+    async def test_response_size_management(self, size_filter):
         """Test response summarization and truncation"""
-        config = FilterConfig(
-            max_response_length=100,
-            summarize_threshold=50
-        )
-        filter_instance = ContentFilter(config)
-        
-        # Test summarization
-        long_content = "This is a very long piece of content. " * 50
-        
-        message = {
-            "jsonrpc": "2.0",
-            "result": {
-                "content": long_content
-            }
-        }
-        
-        result = await filter_instance.filter_message(
-            "server_to_client", "test-session", message
+        # Test summarization; the filter builds new structures, so the shared message is safe
+        result = await size_filter.filter_message(
+            "server_to_client", "test-session", _LONG_MSG
         )
         
         assert result is not None
         content = result["result"]["content"]
-        assert len(content) <= config.max_response_length
+        assert len(content) <= size_filter.config.max_response_length
         
     @pytest.mark.asyncio
-    async def test_clean_passthrough(self):
+    async def test_clean_passthrough(self, default_filter):
         """Test that clean content passes through unmodified"""
         clean_message = {
             "jsonrpc": "2.0",
@@ -216,25 +212,25 @@ class TestContentFilters:
             }
         }
         
-        result = await filter_instance.filter_message(
+        result = await default_filter.filter_message(
             "client_to_server", "test-session", clean_message
         )
         
         assert result == clean_message  # Should be identical
         
     @pytest.mark.asyncio
-    async def test_filter_metrics(self):
+    async def test_filter_metrics(self, default_filter):
         """Test that filter metrics are properly tracked"""
-        initial_metrics = self.content_filter.get_metrics()
+        initial_metrics = default_filter.get_metrics()
         assert initial_metrics["total_requests"] == 0
         
         # Process a message
         message = {"jsonrpc": "2.0", "result": {"content": "test"}}
-        await self.content_filter.filter_message(
+        await default_filter.filter_message(
             "server_to_client", "test-session", message
         )
         
-        updated_metrics = self.content_filter.get_metrics()
+        updated_metrics = default_filter.get_metrics()
         assert updated_metrics["total_requests"] == 1
         
     @pytest.mark.asyncio
@@ -256,8 +252,7 @@ class TestContentFilters:
         assert result is not None
         
         # Update config to block domain
-        new_config = FilterConfig(blocked_domains=["test.com"])
-        filter_instance.update_config(new_config)
+        filter_instance.update_config(replace(config, blocked_domains=["test.com"]))
         
         # Should now be blocked
         result = await filter_instance.filter_message(
@@ -266,7 +261,7 @@ class TestContentFilters:
         assert result is None
         
     @pytest.mark.asyncio
-    async def test_error_handling(self):
+    async def test_error_handling(self, default_filter):
         """Test that filtering errors don't break the system"""
         # Create a message that might cause processing errors
         malformed_message = {
@@ -277,7 +272,7 @@ class TestContentFilters:
         }
         
         # Should not throw exception
-        result = await self.content_filter.filter_message(
+        result = await default_filter.filter_message(
             "server_to_client", "test-session", malformed_message
         )
         
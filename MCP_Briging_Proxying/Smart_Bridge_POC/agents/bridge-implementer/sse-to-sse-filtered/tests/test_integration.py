@@ -16,7 +16,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from sse_process import SSEProcess
-from enhanced_broker import EnhancedBroker
+from enhanced_broker import EnhancedBroker, MAX_PENDING_FRAMES
 from content_filters import FilterConfig
 
 class TestSSEProcess:
@@ -76,6 +76,49 @@ class TestSSEProcess:
         
         # Verify POST was called
         mock_session.post.assert_called_once()
+        
+    @pytest.mark.asyncio
+    async def test_sse_request_response_matching(self):
+        """Test request() resolves by id without touching the shared queue"""
+        sse_proc = SSEProcess("http://localhost:3000/sse")
+        sse_proc.running = True
+        sse_proc.write_json = AsyncMock()
+        
+        mock_response = MagicMock()
+        async def mock_content():
+            yield b"event: message\n"
+            yield b'data: {"jsonrpc": "2.0", "method": "notifications/progress"}\n'
+            yield b"event: message\n"
+            yield b'data: {"jsonrpc": "2.0", "id": "req-1", "result": {}}\n'
+        mock_response.content = mock_content()
+        sse_proc.sse_response = mock_response
+        
+        request_task = asyncio.create_task(sse_proc.request({"jsonrpc": "2.0", "id": "req-1", "method": "ping"}, timeout=1.0))
+        await asyncio.sleep(0)
+        await asyncio.gather(sse_proc._sse_reader_loop(), sse_proc._sse_parser_loop())
+        
+        response = await request_task
+        assert response["id"] == "req-1"
+        assert sse_proc.message_queue.qsize() == 1
+        assert (await sse_proc.read_json())["method"] == "notifications/progress"
+        assert not sse_proc._pending
+        
+    @pytest.mark.asyncio
+    async def test_sse_parser_survives_unhashable_ids(self):
+        """Test that messages with list/object ids are queued instead of crashing the parser"""
+        sse_proc = SSEProcess("http://localhost:3000/sse")
+        for frame in (
+            ("message", '{"jsonrpc": "2.0", "id": [1], "result": {}}'),
+            ("message", '{"jsonrpc": "2.0", "id": {"a": 1}, "result": {}}'),
+            ("message", '{"jsonrpc": "2.0", "id": "after", "result": {}}'),
+            None,
+        ):
+            await sse_proc.frame_queue.put(frame)
+        
+        await asyncio.wait_for(sse_proc._sse_parser_loop(), timeout=1.0)
+        
+        ids = [sse_proc.message_queue.get_nowait()["id"] for _ in range(3)]
+        assert ids == [[1], {"a": 1}, "after"]
 
 class TestEnhancedBroker:
     """Test enhanced broker with filtering"""
@@ -137,6 +180,25 @@ class TestEnhancedBroker:
         await broker.route_from_client(session_id, clean_message)
         self.mock_sse_proc.write_json.assert_called_once()
         
+    @pytest.mark.asyncio
+    async def test_send_waits_for_room_when_buffer_full(self):
+        """Test that a full session buffer delays frames instead of dropping them"""
+        broker = EnhancedBroker(self.mock_sse_proc, self.filter_config)
+        session_id = broker.create_session()
+        session = broker.get_session(session_id)
+        session.frames.extend([b"old"] * MAX_PENDING_FRAMES)
+        
+        send_task = asyncio.create_task(broker._send(session_id, {"jsonrpc": "2.0", "id": 1}))
+        await asyncio.sleep(0.01)
+        assert not send_task.done()
+        
+        # The stream takes one frame and signals the room it made
+        session.frames.popleft()
+        session.drained.set()
+        await asyncio.wait_for(send_task, timeout=1)
+        assert len(session.frames) == MAX_PENDING_FRAMES
+        assert b'"id": 1' in session.frames[-1]
+        
     @pytest.mark.asyncio
     async def test_blocked_message_handling(self):
         """Test handling of blocked messages"""
@@ -1,40 +1,68 @@
 from __future__ import annotations
 import asyncio
-import json
 import logging
 import os
 import time
 import uuid
 from dataclasses import dataclass, field
-from typing import Any, Dict, Set, Optional
+from typing import Any, Dict, List, Set, Optional, Tuple
 
 from fastapi import WebSocket
 
 try:
     from .process import StdioProcess
     from .filters import filters
+    from .framing import dumps_bytes, loads, SSE_MESSAGE_PREFIX, SSE_FRAME_END
 except ImportError:
     from process import StdioProcess
     from filters import filters
+    from framing import dumps_bytes, loads, SSE_MESSAGE_PREFIX, SSE_FRAME_END
 
 logger = logging.getLogger("stdio-gateway")
 
+HEARTBEAT_INTERVAL = float(os.environ.get("BRIDGE_HEARTBEAT_INTERVAL", "15"))
+HEARTBEAT_FRAME = b": heartbeat\n\n"
+PUMP_BATCH_MAX = 32
+
 @dataclass
 class Session:
     session_id: str
     queue: asyncio.Queue[bytes] = field(default_factory=lambda: asyncio.Queue(maxsize=100))
     websockets: Set[WebSocket] = field(default_factory=set)
-    last_beat: float = field(default_factory=time.time)
+    # Monotonic, same clock as loop.time() under the default event loop
+    last_beat: float = field(default_factory=time.monotonic)
+
+# Request ids are rewritten on the way upstream as "<session>|<original id as JSON>",
+# so responses carry their own route back and no shared id table is needed.
+ID_SEP = "|"
+
+def encode_request_id(session_id: str, request_id: Any) -> str:
+    return f"{session_id}{ID_SEP}{dumps_bytes(request_id).decode('utf-8')}"
+
+def decode_request_id(wire_id: Any) -> Optional[Tuple[str, Any]]:
+    """Return (session_id, original id) for ids produced by encode_request_id"""
+    if not isinstance(wire_id, str):
+        return None
+    session_id, sep, rest = wire_id.partition(ID_SEP)
+    if not sep or not rest:
+        return None
+    try:
+        return session_id, loads(rest.encode("utf-8"))
+    except ValueError:
+        return None
 
 class Broker:
     def __init__(self, proc: StdioProcess):
         self.proc = proc
         self.sessions: Dict[str, Session] = {}
-        self.id_to_session: Dict[Any, str] = {}  # JSON-RPC id → session_id
-        self.inbox = asyncio.Queue()  # messages from proc → dict
         self.max_in_flight = int(os.environ.get("BRIDGE_MAX_IN_FLIGHT", "128"))
+        # Bounded so a stalled pump blocks the reader instead of buffering without limit
+        self.inbox = asyncio.Queue(maxsize=self.max_in_flight * 2)  # messages from proc → dict
+        self._inbox_high_water = int(self.inbox.maxsize * 0.8)
+        self._inbox_warned = False
         self.in_flight = 0
-        self._inflight_lock = asyncio.Lock()
+        self._inflight_cond = asyncio.Condition()
+        self._heartbeat_task: Optional[asyncio.Task] = None
         # Allow tests to stub/replace filters
         self.filters = filters
 
@@ -42,16 +70,42 @@ class Broker:
         await self.proc.start()
         asyncio.create_task(self._reader_loop())
         asyncio.create_task(self.pump())
+        self.start_heartbeat()
+
+    def start_heartbeat(self) -> None:
+        """Start queueing heartbeats into idle sessions; a no-op while already running"""
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
 
     async def _reader_loop(self):
         try:
             while True:
                 msg = await self.proc.read_json()
-                await self.inbox.put(msg)
+                try:
+                    self.inbox.put_nowait(msg)
+                except asyncio.QueueFull:
+                    # Only a full inbox pays for the blocking put
+                    await self.inbox.put(msg)
+                depth = self.inbox.qsize()
+                if depth > self._inbox_high_water:
+                    if not self._inbox_warned:
+                        logger.warning("Broker inbox at %d/%d; upstream reads will block until pump catches up",
+                                       depth, self.inbox.maxsize)
+                        self._inbox_warned = True
+                elif self._inbox_warned:
+                    self._inbox_warned = False
         except Exception as e:
             logger.exception("Reader loop ended: %s", e)
             await self.broadcast({"type": "bridge/error", "error": str(e)})
 
+    async def _heartbeat_loop(self):
+        # Idle SSE streams get a comment frame so consumers can block on queue.get()
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            for sess in list(self.sessions.values()):
+                if sess.queue.empty():
+                    sess.queue.put_nowait(HEARTBEAT_FRAME)
+
     def create_session(self) -> str:
         sid = uuid.uuid4().hex
         self.sessions[sid] = Session(sid)
@@ -64,61 +118,91 @@ class Broker:
         return self.sessions[sid]
 
     async def route_from_client(self, session_id: str, payload: Dict[str, Any]) -> None:
-        if "id" in payload:
-            self.id_to_session[payload["id"]] = session_id
         filtered = await self.filters.apply("client_to_server", session_id, payload)
         if filtered is None:
             return
-        async with self._inflight_lock:
-            while self.in_flight >= self.max_in_flight:
-                await asyncio.sleep(0.002)
+        # Only requests: a client's response to a server-initiated request must keep the server's id
+        if "method" in filtered and "id" in filtered:
+            filtered = {**filtered, "id": encode_request_id(session_id, filtered["id"])}
+        async with self._inflight_cond:
+            await self._inflight_cond.wait_for(lambda: self.in_flight < self.max_in_flight)
             self.in_flight += 1
         try:
             await self.proc.write_json(filtered)
         finally:
-            async with self._inflight_lock:
+            async with self._inflight_cond:
                 self.in_flight -= 1
+                self._inflight_cond.notify(1)
 
     async def pump(self):
         while True:
-            msg = await self.inbox.get()
+            # Drain whatever is already queued so a burst becomes one SSE write per session
+            batch = [await self.inbox.get()]
+            while len(batch) < PUMP_BATCH_MAX and not self.inbox.empty():
+                batch.append(self.inbox.get_nowait())
             try:
-                target_sid: Optional[str] = None
-                if "id" in msg and msg["id"] in self.id_to_session:
-                    target_sid = self.id_to_session.pop(msg["id"], None)
-                if target_sid and target_sid in self.sessions:
-                    filtered = await self.filters.apply("server_to_client", target_sid, msg)
-                    if filtered is not None:
-                        await self._send(target_sid, filtered)
-                else:
-                    for sid in list(self.sessions.keys()):
-                        filtered = await self.filters.apply("server_to_client", sid, msg)
+                # Encoded as soon as each filter pass returns: filters may edit the shared dict in place
+                outgoing: Dict[str, List[bytes]] = {}
+                for msg in batch:
+                    # Server-initiated requests carry the server's own ids; only responses are routed
+                    routed = decode_request_id(msg.get("id")) if "method" not in msg else None
+                    if routed is not None:
+                        target_sid, msg["id"] = routed
+                        sess = self.sessions.get(target_sid)
+                        if sess is None:
+                            # A reply for a session that has gone away belongs to nobody else
+                            logger.debug("Dropping response %r for closed session %s", msg["id"], target_sid)
+                            continue
+                        filtered = await self.filters.apply("server_to_client", target_sid, msg)
                         if filtered is not None:
-                            await self._send(sid, filtered)
+                            outgoing.setdefault(target_sid, []).append(dumps_bytes(filtered))
+                    else:
+                        for sid in list(self.sessions.keys()):
+                            filtered = await self.filters.apply("server_to_client", sid, msg)
+                            if filtered is not None:
+                                outgoing.setdefault(sid, []).append(dumps_bytes(filtered))
+                for sid, payloads in outgoing.items():
+                    await self._send_encoded(sid, payloads)
             finally:
-                self.inbox.task_done()
+                for _ in batch:
+                    self.inbox.task_done()
 
     async def _send(self, session_id: str, obj: Any) -> None:
+        await self._send_many(session_id, [obj])
+
+    async def _send_many(self, session_id: str, objs: List[Any]) -> None:
         if session_id not in self.sessions:
             return
-        sess = self.sessions[session_id]
+        # Serialize once for both the SSE frames and any websockets
+        await self._send_encoded(session_id, [dumps_bytes(obj) for obj in objs])
+
+    async def _send_encoded(self, session_id: str, payloads: List[bytes]) -> None:
+        """Deliver already-serialized JSON messages to a session's SSE queue and websockets"""
+        sess = self.sessions.get(session_id)
+        if sess is None:
+            return
+        # Format as proper MCP SSE message events, coalesced into one queue item
+        data = b"".join(SSE_MESSAGE_PREFIX + payload + SSE_FRAME_END for payload in payloads)
         try:
-            # Format as proper MCP SSE message event
-            data = f"event: message\ndata: {json.dumps(obj, ensure_ascii=False)}\n\n".encode("utf-8")
-            await sess.queue.put(data)
+            sess.queue.put_nowait(data)
         except asyncio.QueueFull:
-            logger.warning("Session %s SSE queue full; dropping message", session_id)
-        dead: list[WebSocket] = []
-        for ws in list(sess.websockets):
-            try:
-                await ws.send_text(json.dumps(obj, ensure_ascii=False))
-            except Exception:
-                dead.append(ws)
-        for ws in dead:
-            try:
-                sess.websockets.remove(ws)
-            except KeyError:
-                pass
+            # Only a full queue pays for the blocking put; an item may carry responses clients wait on
+            await sess.queue.put(data)
+        if not sess.websockets:
+            return
+        # Websocket clients expect one JSON-RPC message per text frame
+        texts = [payload.decode("utf-8") for payload in payloads]
+        async def deliver(ws: WebSocket) -> None:
+            # Frames stay in order per socket; sockets are written concurrently
+            for text in texts:
+                await ws.send_text(text)
+
+        # Snapshot because sends yield to the loop; failed sockets are dropped in the same pass
+        targets = tuple(sess.websockets)
+        results = await asyncio.gather(*(deliver(ws) for ws in targets), return_exceptions=True)
+        for ws, result in zip(targets, results):
+            if isinstance(result, Exception):
+                sess.websockets.discard(ws)
 
     async def broadcast(self, obj: Any) -> None:
         for sid in list(self.sessions.keys()):
@@ -1,30 +1,72 @@
 from __future__ import annotations
 import asyncio
+import inspect
 import logging
+import os
 import re
 import time
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 try:
     from .models import FilterInfo
 except ImportError:
     from models import FilterInfo
 
+# Optional: RE2 matches in linear time with no backtracking
+try:
+    import re2 as _secret_re
+except ImportError:
+    _secret_re = re
+
 logger = logging.getLogger("stdio-gateway")
 
 FilterFunc = Callable[[str, str, Dict[str, Any]], asyncio.Future]
 
+# Sync filters on messages with more string content than this run in a worker thread
+OFFLOAD_THRESHOLD = int(os.environ.get("BRIDGE_FILTER_OFFLOAD_BYTES", "65536"))
+
+def _exceeds_size(value: Any, limit: int) -> bool:
+    """Cheap bounded estimate of string payload size; stops as soon as limit is passed"""
+    stack = [value]
+    total = 0
+    while stack:
+        v = stack.pop()
+        if isinstance(v, str):
+            total += len(v)
+            if total > limit:
+                return True
+        elif isinstance(v, dict):
+            stack.extend(v.values())
+        elif isinstance(v, list):
+            stack.extend(v)
+    return False
+
 class FilterChain:
     def __init__(self):
         self.filters: Dict[str, Dict[str, Any]] = {}
-
-    def register(self, name: str, func: Callable[[str, str, Dict[str, Any]], Any], *, enabled: bool = True, description: str = ""):
-        self.filters[name] = {"func": func, "enabled": enabled, "description": description}
+        # (name, func, is_coro) for enabled filters, rebuilt whenever filters change
+        self._enabled_chain: Tuple[Tuple[str, Callable[..., Any], bool], ...] = ()
+
+    def _rebuild(self) -> None:
+        # Stable sort: lower order runs first, ties keep registration order
+        ordered = sorted(self.filters.items(), key=lambda item: item[1].get("order", 0))
+        self._enabled_chain = tuple(
+            (n, meta["func"], meta["is_coro"])
+            for n, meta in ordered
+            if meta["enabled"]
+        )
+
+    def register(self, name: str, func: Callable[[str, str, Dict[str, Any]], Any], *, enabled: bool = True, description: str = "", order: int = 0):
+        # Classified once here so apply() never inspects results per message
+        is_coro = inspect.iscoroutinefunction(func) or inspect.iscoroutinefunction(getattr(func, "__call__", None))
+        self.filters[name] = {"func": func, "enabled": enabled, "description": description, "order": order, "is_coro": is_coro}
+        self._rebuild()
 
     def set_enabled(self, name: str, enabled: bool):
         if name not in self.filters:
             raise KeyError(name)
         self.filters[name]["enabled"] = enabled
+        self._rebuild()
 
     def list(self) -> List[FilterInfo]:
         out: List[FilterInfo] = []
@@ -34,14 +76,22 @@ class FilterChain:
 
     async def apply(self, direction: str, session_id: str, message: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         obj = message
-        for n, meta in self.filters.items():
-            if not meta["enabled"]:
-                continue
-            func = meta["func"]
+        big: Optional[bool] = None
+        for n, func, is_coro in self._enabled_chain:
             try:
-                res = func(direction, session_id, obj)
-                if asyncio.iscoroutine(res):
-                    res = await res
+                if is_coro:
+                    res = await func(direction, session_id, obj)
+                else:
+                    if big is None:
+                        big = _exceeds_size(obj, OFFLOAD_THRESHOLD)
+                    if big:
+                        # Keep large regex/JSON work from stalling other sessions
+                        res = await asyncio.to_thread(func, direction, session_id, obj)
+                    else:
+                        res = func(direction, session_id, obj)
+                    # Plain callables wrapping an async filter hand back an awaitable
+                    if inspect.isawaitable(res):
+                        res = await res
                 if res is None:  # dropped by filter
                     logger.info("Message dropped by filter %s", n)
                     return None
@@ -54,9 +104,11 @@ filters = FilterChain()
 
 # Built-in: redact secrets in strings
 SECRET_PATTERNS = [
-    re.compile(r"(?i)(?:api|secret|access|bearer)[-_ ]?(?:key|token)\s*[:=]\s*[A-Za-z0-9._-]{12,}"),
-    re.compile(r"(?i)sk-[A-Za-z0-9]{20,}"),
+    re.compile(r"(?:api|secret|access|bearer)[-_ ]?(?:key|token)\s*[:=]\s*[A-Za-z0-9._-]{12,}", re.IGNORECASE),
+    re.compile(r"sk-[A-Za-z0-9]{20,}", re.IGNORECASE),
 ]
+# All patterns in one alternation so each string is scanned once
+_SECRETS_RE = _secret_re.compile("(?i)" + "|".join(f"(?:{p.pattern})" for p in SECRET_PATTERNS))
 
 def _walk_strings(value: Any, fn: Callable[[str], str]) -> Any:
     if isinstance(value, str):
@@ -67,13 +119,28 @@ def _walk_strings(value: Any, fn: Callable[[str], str]) -> Any:
         return {k: _walk_strings(v, fn) for k, v in value.items()}
     return value
 
+def _may_hold_secret(s: str) -> bool:
+    # Every pattern needs a ':'/'=' separator or the '-' of an sk- key
+    return ":" in s or "=" in s or "-" in s
+
+def _contains_secret(value: Any) -> bool:
+    if isinstance(value, str):
+        return _may_hold_secret(value) and _SECRETS_RE.search(value) is not None
+    if isinstance(value, list):
+        return any(_contains_secret(v) for v in value)
+    if isinstance(value, dict):
+        return any(_contains_secret(v) for v in value.values())
+    return False
+
 
 def redact_secrets(direction: str, session_id: str, msg: Dict[str, Any]) -> Dict[str, Any]:
+    # Clean messages (the common case) pass through without being rebuilt
+    if not _contains_secret(msg):
+        return msg
     def scrub(s: str) -> str:
-        out = s
-        for pat in SECRET_PATTERNS:
-            out = pat.sub("[REDACTED]", out)
-        return out
+        if not _may_hold_secret(s):
+            return s
+        return _SECRETS_RE.sub("[REDACTED]", s)
     return _walk_strings(msg, scrub)
 
 filters.register("redact_secrets", redact_secrets, description="Masks common API keys/tokens in all string fields")
@@ -81,10 +148,17 @@ filters.register("redact_secrets", redact_secrets, description="Masks common API
 # Built-in: add bridge meta (timestamps & direction)
 
 def add_bridge_meta(direction: str, session_id: str, msg: Dict[str, Any]) -> Dict[str, Any]:
-    meta = msg.get("bridge_meta", {}) if isinstance(msg, dict) else {}
-    meta.update({"ts": time.time(), "direction": direction, "session": session_id})
-    if isinstance(msg, dict):
-        msg["bridge_meta"] = meta
+    if not isinstance(msg, dict):
+        return msg
+    meta = msg.get("bridge_meta")
+    if isinstance(meta, dict):
+        # Keep keys set by earlier hops, update ours in place
+        meta["ts"] = time.time()
+        meta["direction"] = direction
+        meta["session"] = session_id
+    else:
+        msg["bridge_meta"] = {"ts": time.time(), "direction": direction, "session": session_id}
     return msg
 
-filters.register("add_bridge_meta", add_bridge_meta, enabled=False, description="Attach bridge_meta with ts/direction/session")
+# Runs last so redaction never walks the meta it adds
+filters.register("add_bridge_meta", add_bridge_meta, enabled=False, description="Attach bridge_meta with ts/direction/session", order=100)
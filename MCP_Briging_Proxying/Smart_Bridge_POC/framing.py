@@ -3,28 +3,48 @@ import asyncio
 import json
 from typing import Any, Dict
 
+# Optional: orjson encodes straight to compact UTF-8 bytes and parses bytes directly
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 CRLF = b"\r\n"
 HEADER_SEP = CRLF + CRLF
 
+# SSE frame pieces, concatenated around dumps_bytes() output
+SSE_DATA_PREFIX = b"data: "
+SSE_MESSAGE_PREFIX = b"event: message\n" + SSE_DATA_PREFIX
+SSE_ENDPOINT_PREFIX = b"event: endpoint\n" + SSE_DATA_PREFIX
+SSE_FRAME_END = b"\n\n"
+
+if orjson is not None:
+    def dumps_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    loads = orjson.loads
+else:
+    def dumps_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    def loads(data: bytes) -> Any:
+        return json.loads(data.decode("utf-8"))
+
 async def read_exact(stream: asyncio.StreamReader, n: int) -> bytes:
-    buf = bytearray()
-    while len(buf) < n:
-        chunk = await stream.read(n - len(buf))
-        if not chunk:
-            raise EOFError("Unexpected EOF while reading framed body")
-        buf.extend(chunk)
-    return bytes(buf)
+    try:
+        return await stream.readexactly(n)
+    except asyncio.IncompleteReadError as e:
+        raise EOFError("Unexpected EOF while reading framed body") from e
 
 async def read_headers(stream: asyncio.StreamReader) -> Dict[str, str]:
-    data = bytearray()
-    while True:
-        ch = await stream.read(1)
-        if not ch:
-            raise EOFError("Unexpected EOF while reading headers")
-        data.extend(ch)
-        if data.endswith(HEADER_SEP):
-            break
-    header_text = data[:-4].decode("ascii", errors="strict")
+    # StreamReader scans its own buffer for the separator: one await per header block
+    try:
+        data = await stream.readuntil(HEADER_SEP)
+    except asyncio.IncompleteReadError as e:
+        raise EOFError("Unexpected EOF while reading headers") from e
+    except asyncio.LimitOverrunError as e:
+        raise ValueError("Header block exceeds stream buffer limit") from e
+    header_text = data[:-len(HEADER_SEP)].decode("ascii", errors="strict")
     headers: Dict[str, str] = {}
     for line in header_text.split("\r\n"):
         if not line:
@@ -45,11 +65,11 @@ async def read_framed_json(stream: asyncio.StreamReader) -> Dict[str, Any]:
         raise ValueError("Bad Content-Length") from e
     body = await read_exact(stream, length)
     try:
-        return json.loads(body.decode("utf-8"))
-    except json.JSONDecodeError as e:
+        return loads(body)
+    except json.JSONDecodeError as e:  # orjson.JSONDecodeError subclasses this
         raise ValueError(f"Bad JSON payload: {e}")
 
 def encode_framed_json(obj: Dict[str, Any]) -> bytes:
-    data = json.dumps(obj, separators=( ",", ":"), ensure_ascii=False).encode("utf-8")
+    data = dumps_bytes(obj)
     header = f"Content-Length: {len(data)}\r\n\r\n".encode("ascii")
     return header + data
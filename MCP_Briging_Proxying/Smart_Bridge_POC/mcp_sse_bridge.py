@@ -7,23 +7,29 @@ Converts stdio MCP servers to SSE transport following official MCP specification
 from __future__ import annotations
 import argparse
 import asyncio
-import json
 import logging
+import logging.handlers
 import os
+import queue
 import sys
-import time
 import uuid
-from typing import Any, AsyncGenerator, Dict, Optional, List
-from dataclasses import dataclass, asdict
+from collections import deque
+from itertools import count
+from typing import Any, AsyncGenerator, Deque, Dict, Optional, List, Tuple
+from dataclasses import dataclass, field, fields
 
 from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse, PlainTextResponse
 import uvicorn
 
 try:
     from .process import StdioProcess
+    from .broker import encode_request_id, decode_request_id
+    from .framing import dumps_bytes, loads, SSE_DATA_PREFIX, SSE_FRAME_END
 except ImportError:
     from process import StdioProcess
+    from broker import encode_request_id, decode_request_id
+    from framing import dumps_bytes, loads, SSE_DATA_PREFIX, SSE_FRAME_END
 
 
 # ----------------------------- Logging ------------------------------------
@@ -35,8 +41,30 @@ logger.addHandler(handler)
 logger.setLevel(logging.INFO)
 
 
+def start_log_listener() -> logging.handlers.QueueListener:
+    """Hand stderr writes to a background thread so logging never blocks the event loop"""
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    logger.removeHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener.start()
+    return listener
+
+
+def stop_log_listener(listener: logging.handlers.QueueListener):
+    """Flush queued records and write directly to stderr again"""
+    listener.stop()
+    for queued in [h for h in logger.handlers if isinstance(h, logging.handlers.QueueHandler)]:
+        logger.removeHandler(queued)
+    logger.addHandler(handler)
+
+
 # ----------------------------- MCP Models ---------------------------------
-@dataclass
+# slots=True is only accepted by dataclass() on Python 3.10+
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**DATACLASS_SLOTS)
 class MCPCapabilities:
     """MCP server capabilities"""
     resources: Optional[Dict[str, Any]] = None
@@ -45,41 +73,66 @@ class MCPCapabilities:
     sampling: Optional[Dict[str, Any]] = None
 
 
-@dataclass
-class MCPInitializeRequest:
-    """MCP initialize request"""
-    jsonrpc: str = "2.0"
-    id: str = "init"
-    method: str = "initialize"
-    params: Dict[str, Any] = None
-
-    def __post_init__(self):
-        if self.params is None:
-            self.params = {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {
-                    "roots": {"listChanged": True},
-                    "sampling": {}
-                },
-                "clientInfo": {
-                    "name": "MCP SSE Bridge",
-                    "version": "1.0.0"
-                }
-            }
+# Capabilities we model; servers may advertise others (logging, completions, experimental, ...)
+CAPABILITY_FIELDS = frozenset(f.name for f in fields(MCPCapabilities))
 
 
-@dataclass
+# MCP initialize request; a fixed payload, sent as-is and never mutated
+INIT_REQUEST = {
+    "jsonrpc": "2.0",
+    "id": "init",
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {
+            "roots": {"listChanged": True},
+            "sampling": {}
+        },
+        "clientInfo": {
+            "name": "MCP SSE Bridge",
+            "version": "1.0.0"
+        }
+    }
+}
+
+
+@dataclass(**DATACLASS_SLOTS)
 class MCPConnection:
     """Represents a single MCP client connection"""
     connection_id: str
-    stdio_process: StdioProcess
-    capabilities: Optional[MCPCapabilities] = None
-    initialized: bool = False
-    message_queue: asyncio.Queue = None
-    
-    def __post_init__(self):
-        if self.message_queue is None:
-            self.message_queue = asyncio.Queue()
+    # Single-consumer buffer for the SSE stream; wakeup is set whenever a message lands
+    buffer: Deque[Dict[str, Any]] = field(default_factory=deque)
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+
+
+# ----------------------------- SSE Frames ---------------------------------
+# Fixed stream frames, encoded once; the hello is split around its connection id
+RETRY_FRAME = b"retry: 3000\n\n"
+HEARTBEAT_FRAME = b": heartbeat\n\n"
+# Most buffered messages a stream coalesces into a single write
+SSE_DRAIN_MAX = 32
+# Most messages held for a connection's SSE stream before new ones are dropped
+CONNECTION_BUFFER_MAX = 1024
+HELLO_FRAME_HEAD, _, HELLO_FRAME_TAIL = (SSE_DATA_PREFIX + dumps_bytes({
+    "jsonrpc": "2.0",
+    "method": "notifications/message",
+    "params": {
+        "level": "info",
+        "message": "MCP SSE connection established: CONNECTION_ID"
+    }
+}) + SSE_FRAME_END).partition(b"CONNECTION_ID")
+
+
+# Sequence for requests the bridge itself sends upstream; the method prefix on
+# each id keeps them clear of the ids clients post through /message
+request_counter = count(1)
+
+# Seconds to wait for the MCP server to answer a bridge-originated request
+REQUEST_TIMEOUT = 10.0
+
+# Seconds a tools/resources/prompts listing is served from cache; a list_changed
+# notification from the server drops the entry sooner
+LISTING_CACHE_TTL = 5.0
 
 
 # ----------------------------- MCP Bridge ---------------------------------
@@ -89,175 +142,286 @@ class MCPSSEBridge:
     def __init__(self, cmd: str, cwd: Optional[str] = None):
         self.cmd = cmd
         self.cwd = cwd
+        # Environment snapshot for the stdio server; StdioProcess only reads it, so no per-spawn copy
+        self.env: Dict[str, str] = os.environ.copy()
         self.connections: Dict[str, MCPConnection] = {}
         self.running = False
+        # One stdio server, initialized once and multiplexed across every connection
+        self.stdio_process: Optional[StdioProcess] = None
+        self.reader_task: Optional[asyncio.Task] = None
+        self.capabilities: Optional[MCPCapabilities] = None
+        self.initialized = False
+        # Bridge-originated requests awaiting their response, by JSON-RPC id
+        self.pending: Dict[str, asyncio.Future] = {}
+        # Parameterless requests in flight, shared by concurrent callers of the same method
+        self.inflight: Dict[str, asyncio.Future] = {}
+        # Serialized listing results by method, with the loop time they were fetched
+        self.listings: Dict[str, Tuple[float, bytes]] = {}
+        # Serializes (re)starts so concurrent connects share one replacement server
+        self._server_lock = asyncio.Lock()
     
     async def start(self):
-        """Start the bridge"""
+        """Start the bridge and its shared stdio server"""
         self.running = True
-        logger.info(f"Started MCP SSE Bridge with command: {self.cmd}")
+        await self._ensure_server()
+        logger.info("Started MCP SSE Bridge with command: %s", self.cmd)
     
     async def stop(self):
         """Stop the bridge and cleanup connections"""
         self.running = False
+        await self._stop_server()
+        self._close_all()
+        logger.info("Stopped MCP SSE Bridge")
+    
+    async def _ensure_server(self):
+        """Start and initialize the shared stdio server unless a live, initialized one is up"""
+        async with self._server_lock:
+            if self.initialized:
+                return
+            # Never started, exited, or failed to initialize: replace it
+            await self._stop_server()
+            self.listings.clear()
+            self.stdio_process = StdioProcess(cmd=self.cmd, cwd=self.cwd, env=self.env)
+            await self.stdio_process.start()
+            self.reader_task = asyncio.create_task(self._process_stdio_messages(self.stdio_process))
+            await self._initialize_mcp_connection()
+    
+    async def _stop_server(self):
+        # Cancelled rather than left to see EOF: the shell's child may hold stdout open
+        if self.reader_task:
+            self.reader_task.cancel()
+        process = self.stdio_process
+        if process and process.proc and process.proc.returncode is None:
+            await process.terminate()
+    
+    def _close_all(self):
+        """Fail outstanding requests and end every stream, so none waits out its timeout"""
+        # The server is gone for every connection at once; the next connect starts a new one
+        self.initialized = False
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError("MCP server connection closed"))
         for conn in self.connections.values():
-            if conn.stdio_process.proc and conn.stdio_process.proc.returncode is None:
-                await conn.stdio_process.terminate()
+            conn.wakeup.set()
         self.connections.clear()
-        logger.info("Stopped MCP SSE Bridge")
     
     async def create_connection(self) -> str:
-        """Create a new MCP connection"""
+        """Create a new MCP connection on the shared stdio server"""
+        await self._ensure_server()
+        if not self.initialized:
+            raise ConnectionError("MCP server is not available")
         connection_id = str(uuid.uuid4())
-        
-        # Start stdio process for this connection
-        stdio_process = StdioProcess(cmd=self.cmd, cwd=self.cwd, env=os.environ.copy())
-        await stdio_process.start()
-        
-        # Create connection
-        conn = MCPConnection(
-            connection_id=connection_id,
-            stdio_process=stdio_process
-        )
-        
-        self.connections[connection_id] = conn
-        
-        # Start message processing task
-        asyncio.create_task(self._process_stdio_messages(connection_id))
-        
-        # Initialize MCP connection
-        await self._initialize_mcp_connection(connection_id)
-        
-        logger.info(f"Created MCP connection: {connection_id}")
+        self.connections[connection_id] = MCPConnection(connection_id=connection_id)
+        logger.info("Created MCP connection: %s", connection_id)
         return connection_id
     
-    async def _initialize_mcp_connection(self, connection_id: str):
+    async def _initialize_mcp_connection(self):
         """Initialize MCP protocol with the stdio server"""
-        conn = self.connections[connection_id]
-        
-        # Send initialize request
-        init_request = MCPInitializeRequest()
-        await conn.stdio_process.send_message(asdict(init_request))
-        
-        # Wait for initialize response
+        # Send initialize request; the reader task hands back the response
         try:
-            response = await asyncio.wait_for(
-                conn.stdio_process.receive_message(), 
-                timeout=10.0
-            )
+            response = await self._call(INIT_REQUEST, REQUEST_TIMEOUT)
             
             if response and response.get("result"):
-                conn.capabilities = MCPCapabilities(**response["result"].get("capabilities", {}))
-                conn.initialized = True
+                advertised = response["result"].get("capabilities") or {}
+                self.capabilities = MCPCapabilities(**{k: v for k, v in advertised.items() if k in CAPABILITY_FIELDS})
+                self.initialized = True
                 
                 # Send initialized notification
                 initialized_notification = {
                     "jsonrpc": "2.0",
                     "method": "notifications/initialized"
                 }
-                await conn.stdio_process.send_message(initialized_notification)
+                await self.stdio_process.send_message(initialized_notification)
                 
-                logger.info(f"MCP connection {connection_id} initialized successfully")
+                logger.info("MCP server initialized successfully")
             else:
-                logger.error(f"Failed to initialize MCP connection {connection_id}: {response}")
+                logger.error("Failed to initialize MCP server: %s", response)
                 
-        except asyncio.TimeoutError:
-            logger.error(f"Timeout initializing MCP connection {connection_id}")
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            logger.error("Could not initialize MCP server: %r", e)
     
-    async def _process_stdio_messages(self, connection_id: str):
-        """Process messages from stdio server and queue them for SSE"""
-        conn = self.connections.get(connection_id)
-        if not conn:
-            return
-            
+    async def _process_stdio_messages(self, process: StdioProcess):
+        """Process messages from the stdio server and route them to waiters and streams"""
         try:
-            while self.running and conn.stdio_process.proc and conn.stdio_process.proc.returncode is None:
+            # Blocks until the server writes; process exit ends the loop via EOF, stop() by cancelling
+            while self.running:
                 try:
-                    message = await asyncio.wait_for(
-                        conn.stdio_process.receive_message(),
-                        timeout=1.0
-                    )
+                    message = await process.read_json()
                     if message:
-                        await conn.message_queue.put(message)
-                except asyncio.TimeoutError:
-                    continue
+                        self._dispatch(message)
+                except EOFError:
+                    break
+                except ValueError as e:
+                    logger.error("Malformed message from stdio server: %s", e)
                 except Exception as e:
-                    logger.error(f"Error processing stdio message for {connection_id}: {e}")
+                    logger.error("Error processing stdio message: %s", e)
                     break
         except Exception as e:
-            logger.error(f"Stdio message processing task failed for {connection_id}: {e}")
+            logger.error("Stdio message processing task failed: %s", e)
         finally:
-            # Cleanup connection
-            if connection_id in self.connections:
-                del self.connections[connection_id]
-                logger.info(f"Cleaned up MCP connection: {connection_id}")
+            # A reader for a server already replaced by _ensure_server must not tear down its successor
+            if process is self.stdio_process:
+                self._close_all()
+    
+    def _dispatch(self, message: Dict[str, Any]):
+        """Hand one server message to its waiter, its connection, or every connection"""
+        method = message.get("method")
+        if method is None:
+            # A response: ours are plain strings, client ones carry their connection id
+            msg_id = message.get("id")
+            if not isinstance(msg_id, str):
+                logger.debug("Dropping response with untracked id %r", msg_id)
+                return
+            future = self.pending.pop(msg_id, None)
+            if future is not None:
+                if not future.done():
+                    future.set_result(message)
+                return
+            routed = decode_request_id(msg_id)
+            conn = self.connections.get(routed[0]) if routed else None
+            if conn is None:
+                logger.debug("Dropping response for closed or unknown connection: %s", msg_id)
+                return
+            self._enqueue(conn, {**message, "id": routed[1]})
+            return
+        
+        if method.endswith("/list_changed"):
+            # notifications/tools/list_changed -> tools/list
+            self.listings.pop(method[len("notifications/"):-len("_changed")], None)
+        # Notifications and server-initiated requests concern every client
+        for conn in self.connections.values():
+            self._enqueue(conn, message)
+    
+    def _enqueue(self, conn: MCPConnection, message: Dict[str, Any]):
+        if len(conn.buffer) >= CONNECTION_BUFFER_MAX:
+            # Slow or absent SSE client; keep reading so other connections and waiters still get theirs
+            logger.warning("Connection %s SSE buffer full; dropping message", conn.connection_id)
+            return
+        conn.buffer.append(message)
+        conn.wakeup.set()
     
     async def send_message(self, connection_id: str, message: Dict[str, Any]) -> bool:
         """Send message to stdio server"""
-        conn = self.connections.get(connection_id)
-        if not conn or not conn.initialized:
+        if connection_id not in self.connections or not self.initialized:
             return False
-            
+        
+        if "method" in message and "id" in message:
+            # Tag the request id so the shared server's response finds this connection again
+            message = {**message, "id": encode_request_id(connection_id, message["id"])}
         try:
-            await conn.stdio_process.send_message(message)
+            await self.stdio_process.send_message(message)
             return True
         except Exception as e:
-            logger.error(f"Error sending message to {connection_id}: {e}")
+            logger.error("Error sending message to %s: %s", connection_id, e)
             return False
     
+    async def request(self, connection_id: str, method: str, params: Optional[Dict[str, Any]] = None,
+                      prefix: Optional[str] = None, timeout: float = REQUEST_TIMEOUT) -> Dict[str, Any]:
+        """Send a request to the stdio server and wait for its response message"""
+        if connection_id not in self.connections or not self.initialized:
+            raise ConnectionError(f"MCP connection {connection_id} is not ready")
+        
+        message = {"jsonrpc": "2.0", "id": f"{prefix or method}-{next(request_counter)}", "method": method}
+        if params is not None:
+            message["params"] = params
+            return await self._call(message, timeout)
+        
+        # Concurrent identical listings, from any connection, collapse onto the one in flight
+        shared = self.inflight.get(method)
+        if shared is None:
+            shared = asyncio.ensure_future(self._call(message, timeout))
+            self.inflight[method] = shared
+            shared.add_done_callback(lambda _: self.inflight.pop(method, None))
+        return await asyncio.shield(shared)
+    
+    async def _call(self, message: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Write one request and await the response the reader task routes back by id"""
+        future = asyncio.get_running_loop().create_future()
+        self.pending[message["id"]] = future
+        try:
+            await self.stdio_process.send_message(message)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending.pop(message["id"], None)
+    
     async def get_message_stream(self, connection_id: str) -> AsyncGenerator[bytes, None]:
         """Get SSE stream for a connection"""
         conn = self.connections.get(connection_id)
         if not conn:
             return
             
-        # Send SSE headers
-        yield b"retry: 3000\n\n"
-        
-        # Send connection established event
-        hello_event = {
-            "jsonrpc": "2.0",
-            "method": "notifications/message",
-            "params": {
-                "level": "info",
-                "message": f"MCP SSE connection established: {connection_id}"
-            }
-        }
-        yield f"data: {json.dumps(hello_event)}\n\n".encode()
-        
-        # Stream messages
-        while self.running and connection_id in self.connections:
-            try:
-                # Wait for message with timeout for heartbeat
+        buffer = conn.buffer
+        waiter = None
+        try:
+            # Send SSE headers
+            yield RETRY_FRAME
+            
+            # Send connection established event (connection ids are uuid4 strings, no escaping needed)
+            yield HELLO_FRAME_HEAD + connection_id.encode("ascii") + HELLO_FRAME_TAIL
+            
+            # Stream messages; one pending wakeup wait is kept across heartbeat ticks
+            while self.running and self.initialized and connection_id in self.connections:
                 try:
-                    message = await asyncio.wait_for(conn.message_queue.get(), timeout=30.0)
-                    yield f"data: {json.dumps(message)}\n\n".encode()
-                    conn.message_queue.task_done()
-                except asyncio.TimeoutError:
-                    # Send heartbeat
-                    yield b": heartbeat\n\n"
-                    
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Error in message stream for {connection_id}: {e}")
-                break
+                    if buffer:
+                        # Coalesce a burst into one write, capped so heartbeats and exits stay responsive
+                        frames = [SSE_DATA_PREFIX + dumps_bytes(buffer.popleft()) + SSE_FRAME_END
+                                  for _ in range(min(len(buffer), SSE_DRAIN_MAX))]
+                        yield frames[0] if len(frames) == 1 else b"".join(frames)
+                        continue
+                    if waiter is None:
+                        # Nothing buffered, and no await since the check, so clearing cannot lose a set()
+                        conn.wakeup.clear()
+                        waiter = asyncio.ensure_future(conn.wakeup.wait())
+                    done, _ = await asyncio.wait((waiter,), timeout=30.0)
+                    if done:
+                        waiter = None
+                    else:
+                        # Send heartbeat
+                        yield HEARTBEAT_FRAME
+
+                except asyncio.CancelledError:
+                    break
+                except Exception as e:
+                    logger.error("Error in message stream for %s: %s", connection_id, e)
+                    break
+        finally:
+            if waiter is not None:
+                waiter.cancel()
+            # Ended by the client or the server; stop buffering broadcasts for it
+            self.connections.pop(connection_id, None)
 
 
 # ----------------------------- FastAPI App --------------------------------
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with framing.dumps_bytes (orjson when installed)"""
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
+
 app = FastAPI(
     title="MCP SSE Bridge", 
     version="1.0.0", 
-    description="MCP-compliant SSE transport bridge for stdio MCP servers"
+    description="MCP-compliant SSE transport bridge for stdio MCP servers",
+    default_response_class=FastJSONResponse
 )
 
 bridge: Optional[MCPSSEBridge] = None
 
+# Fixed reply, serialized once and shared across requests
+STATUS_OK = Response(b'{"status":"ok"}', media_type="application/json")
+
+# Sent with every event stream; Starlette only reads the mapping, so one dict serves all
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Cache-Control"
+}
+
 @app.on_event("startup")
 async def startup():
     global bridge
-    if hasattr(app.state, "config"):
-        cfg = app.state.config
+    cfg = getattr(app.state, "config", None)
+    if cfg is not None:
         bridge = MCPSSEBridge(cmd=cfg.cmd, cwd=cfg.cwd)
         await bridge.start()
 
@@ -270,8 +434,9 @@ async def shutdown():
 @app.get("/health")
 async def health():
     """Health check endpoint"""
-    return JSONResponse({
-        "status": "ok" if bridge and bridge.running else "degraded",
+    return FastJSONResponse({
+        # Not initialized: the server exited or never finished its handshake; the next connect restarts it
+        "status": "ok" if bridge and bridge.running and bridge.initialized else "degraded",
         "connections": len(bridge.connections) if bridge else 0
     })
 
@@ -281,12 +446,15 @@ async def create_sse_connection(request: Request):
     if not bridge:
         raise HTTPException(503, "Bridge not ready")
     
-    connection_id = await bridge.create_connection()
+    try:
+        connection_id = await bridge.create_connection()
+    except ConnectionError as e:
+        raise HTTPException(503, str(e))
     
     # Get base URL from request
     base_url = str(request.base_url).rstrip("/")
     
-    return JSONResponse({
+    return FastJSONResponse({
         "transport": {
             "type": "sse",
             "url": f"{base_url}/sse/{connection_id}/events"
@@ -298,31 +466,31 @@ async def create_sse_connection(request: Request):
         }
     })
 
+def require_connection(connection_id: str) -> MCPConnection:
+    """Look up a live connection once, or fail the request with 404"""
+    conn = bridge.connections.get(connection_id) if bridge else None
+    if conn is None:
+        raise HTTPException(404, "Connection not found")
+    return conn
+
 @app.get("/sse/{connection_id}/events")
 async def sse_events(connection_id: str):
     """SSE event stream for MCP connection"""
-    if not bridge or connection_id not in bridge.connections:
-        raise HTTPException(404, "Connection not found")
+    require_connection(connection_id)
     
     return StreamingResponse(
         bridge.get_message_stream(connection_id),
         media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "Access-Control-Allow-Origin": "*",
-            "Access-Control-Allow-Headers": "Cache-Control"
-        }
+        headers=SSE_HEADERS
     )
 
 @app.post("/sse/{connection_id}/message")
 async def send_message(connection_id: str, request: Request):
     """Send message to MCP server"""
-    if not bridge or connection_id not in bridge.connections:
-        raise HTTPException(404, "Connection not found")
+    require_connection(connection_id)
     
     try:
-        message = await request.json()
+        message = loads(await request.body())
     except Exception:
         raise HTTPException(400, "Invalid JSON")
     
@@ -330,149 +498,82 @@ async def send_message(connection_id: str, request: Request):
     if not success:
         raise HTTPException(500, "Failed to send message")
     
-    return JSONResponse({"status": "ok"})
+    return STATUS_OK
 
 # ----------------------------- MCP Endpoints ------------------------------
 
-@app.get("/sse/{connection_id}/resources")
-async def list_resources(connection_id: str):
-    """List available resources from MCP server"""
-    if not bridge or connection_id not in bridge.connections:
-        raise HTTPException(404, "Connection not found")
+async def forward_request(conn: MCPConnection, method: str, params: Optional[Dict[str, Any]] = None,
+                          prefix: Optional[str] = None) -> Response:
+    """Relay a request to the connection's MCP server and reply with its result"""
+    connection_id = conn.connection_id
     
-    # Send resources/list request to MCP server
-    request_msg = {
-        "jsonrpc": "2.0",
-        "id": f"resources-{time.time()}",
-        "method": "resources/list"
-    }
+    # Parameterless calls are listings; repeat polls within the TTL skip the round trip
+    now = asyncio.get_running_loop().time()
+    if params is None:
+        cached = bridge.listings.get(method)
+        if cached is not None and now - cached[0] < LISTING_CACHE_TTL:
+            return Response(cached[1], media_type="application/json")
     
-    success = await bridge.send_message(connection_id, request_msg)
-    if not success:
+    try:
+        response = await bridge.request(connection_id, method, params, prefix)
+    except asyncio.TimeoutError:
+        raise HTTPException(504, f"MCP server did not answer {method}")
+    except Exception as e:
+        logger.error("Error relaying %s to %s: %s", method, connection_id, e)
         raise HTTPException(500, "Failed to send request")
     
-    # Note: In real implementation, we'd wait for response and return it
-    # For now, return empty list as placeholder
-    return JSONResponse({"resources": []})
+    if "error" in response:
+        raise HTTPException(502, response["error"])
+    body = dumps_bytes(response.get("result", {}))
+    if params is None:
+        bridge.listings[method] = (now, body)
+    return Response(body, media_type="application/json")
+
+@app.get("/sse/{connection_id}/resources")
+async def list_resources(connection_id: str):
+    """List available resources from MCP server"""
+    return await forward_request(require_connection(connection_id), "resources/list", prefix="resources")
 
 @app.get("/sse/{connection_id}/resources/{uri:path}")
 async def read_resource(connection_id: str, uri: str):
     """Read a specific resource from MCP server"""
-    if not bridge or connection_id not in bridge.connections:
-        raise HTTPException(404, "Connection not found")
-    
-    # Send resources/read request to MCP server
-    request_msg = {
-        "jsonrpc": "2.0", 
-        "id": f"resource-{time.time()}",
-        "method": "resources/read",
-        "params": {"uri": uri}
-    }
-    
-    success = await bridge.send_message(connection_id, request_msg)
-    if not success:
-        raise HTTPException(500, "Failed to send request")
-    
-    # Note: In real implementation, we'd wait for response and return it
-    return JSONResponse({"uri": uri, "mimeType": "text/plain", "text": ""})
+    return await forward_request(require_connection(connection_id), "resources/read", {"uri": uri}, prefix="resource")
 
 @app.get("/sse/{connection_id}/tools")
 async def list_tools(connection_id: str):
     """List available tools from MCP server"""
-    if not bridge or connection_id not in bridge.connections:
-        raise HTTPException(404, "Connection not found")
-    
-    # Send tools/list request to MCP server
-    request_msg = {
-        "jsonrpc": "2.0",
-        "id": f"tools-{time.time()}",
-        "method": "tools/list"
-    }
-    
-    success = await bridge.send_message(connection_id, request_msg)
-    if not success:
-        raise HTTPException(500, "Failed to send request")
-    
-    # Note: In real implementation, we'd wait for response and return it
-    return JSONResponse({"tools": []})
+    return await forward_request(require_connection(connection_id), "tools/list", prefix="tools")
 
 @app.post("/sse/{connection_id}/tools/{tool_name}/call")
 async def call_tool(connection_id: str, tool_name: str, request: Request):
     """Call a tool on the MCP server"""
-    if not bridge or connection_id not in bridge.connections:
-        raise HTTPException(404, "Connection not found")
+    conn = require_connection(connection_id)
     
     try:
-        params = await request.json()
+        params = loads(await request.body())
     except Exception:
         raise HTTPException(400, "Invalid JSON")
     
-    # Send tools/call request to MCP server
-    request_msg = {
-        "jsonrpc": "2.0",
-        "id": f"tool-call-{time.time()}",
-        "method": "tools/call",
-        "params": {
-            "name": tool_name,
-            "arguments": params
-        }
-    }
-    
-    success = await bridge.send_message(connection_id, request_msg)
-    if not success:
-        raise HTTPException(500, "Failed to send request")
-    
-    # Note: In real implementation, we'd wait for response and return it
-    return JSONResponse({"content": []})
+    return await forward_request(conn, "tools/call", {"name": tool_name, "arguments": params},
+                                 prefix="tool-call")
 
 @app.get("/sse/{connection_id}/prompts")
 async def list_prompts(connection_id: str):
     """List available prompts from MCP server"""
-    if not bridge or connection_id not in bridge.connections:
-        raise HTTPException(404, "Connection not found")
-    
-    # Send prompts/list request to MCP server
-    request_msg = {
-        "jsonrpc": "2.0",
-        "id": f"prompts-{time.time()}",
-        "method": "prompts/list"
-    }
-    
-    success = await bridge.send_message(connection_id, request_msg)
-    if not success:
-        raise HTTPException(500, "Failed to send request")
-    
-    # Note: In real implementation, we'd wait for response and return it
-    return JSONResponse({"prompts": []})
+    return await forward_request(require_connection(connection_id), "prompts/list", prefix="prompts")
 
 @app.post("/sse/{connection_id}/prompts/{prompt_name}/get")
 async def get_prompt(connection_id: str, prompt_name: str, request: Request):
     """Get a prompt from the MCP server"""
-    if not bridge or connection_id not in bridge.connections:
-        raise HTTPException(404, "Connection not found")
+    conn = require_connection(connection_id)
     
     try:
-        params = await request.json()
+        params = loads(await request.body())
     except Exception:
         params = {}
     
-    # Send prompts/get request to MCP server
-    request_msg = {
-        "jsonrpc": "2.0",
-        "id": f"prompt-get-{time.time()}",
-        "method": "prompts/get",
-        "params": {
-            "name": prompt_name,
-            "arguments": params
-        }
-    }
-    
-    success = await bridge.send_message(connection_id, request_msg)
-    if not success:
-        raise HTTPException(500, "Failed to send request")
-    
-    # Note: In real implementation, we'd wait for response and return it
-    return JSONResponse({"messages": []})
+    return await forward_request(conn, "prompts/get", {"name": prompt_name, "arguments": params},
+                                 prefix="prompt-get")
 
 @app.get("/")
 async def root():
@@ -487,16 +588,28 @@ def parse_args(argv: Optional[List[str]] = None):
     parser.add_argument("--port", type=int, default=8080, help="Port to run bridge on")
     parser.add_argument("--host", default="0.0.0.0", help="Host to bind to")
     parser.add_argument("--cwd", help="Working directory for stdio server")
+    parser.add_argument("--loop", default="auto", choices=["auto", "asyncio", "uvloop"], help="Event loop implementation (auto picks uvloop when installed)")
+    parser.add_argument("--http", default="auto", choices=["auto", "h11", "httptools"], help="HTTP parser (auto picks httptools when installed)")
     return parser.parse_args(argv)
 
 def main():
     args = parse_args()
     app.state.config = args
+    # None of our formats print thread/process fields; skip collecting them per record
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+    listener = start_log_listener()
     
-    logger.info(f"Starting MCP SSE Bridge on {args.host}:{args.port}")
-    logger.info(f"MCP Server command: {args.cmd}")
+    logger.info("Starting MCP SSE Bridge on %s:%s", args.host, args.port)
+    logger.info("MCP Server command: %s", args.cmd)
+    logger.info("Event loop: %s, HTTP parser: %s", args.loop, args.http)
     
-    uvicorn.run(app, host=args.host, port=args.port, log_level="info")
+    try:
+        # Single worker: connections and the shared stdio server live in this process
+        uvicorn.run(app, host=args.host, port=args.port, log_level="info", loop=args.loop, http=args.http)
+    finally:
+        stop_log_listener(listener)
 
 if __name__ == "__main__":
     try:
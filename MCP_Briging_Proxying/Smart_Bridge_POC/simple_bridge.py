@@ -15,15 +15,17 @@ import uuid
 from typing import Any, AsyncGenerator, Dict, Optional, List, Union
 
 from fastapi import FastAPI, HTTPException, Request, Header
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import uvicorn
 
 try:
     from .process import StdioProcess
-    from .broker import Broker
+    from .broker import Broker, Session
+    from .framing import dumps_bytes, loads, SSE_ENDPOINT_PREFIX, SSE_FRAME_END
 except ImportError:
     from process import StdioProcess
-    from broker import Broker
+    from broker import Broker, Session
+    from framing import dumps_bytes, loads, SSE_ENDPOINT_PREFIX, SSE_FRAME_END
 
 # ----------------------------- Logging ------------------------------------
 logger = logging.getLogger("simple-bridge")
@@ -47,15 +49,53 @@ def check_auth(authorization: Optional[str] = None, x_api_key: Optional[str] = N
             raise HTTPException(401, "Invalid API key")
 
 # ----------------------------- FastAPI App --------------------------------
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with framing.dumps_bytes (orjson when installed)"""
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
+
 app = FastAPI(
     title="Simple MCP Bridge", 
     version="1.0.0", 
-    description="Simplified MCP SSE bridge for stdio MCP servers"
+    description="Simplified MCP SSE bridge for stdio MCP servers",
+    default_response_class=FastJSONResponse
 )
 
 # Global broker instance
 broker: Optional[Broker] = None
 
+async def read_body(request: Request) -> bytes:
+    """Raw request body straight from the ASGI stream, without Starlette's cached copy"""
+    chunks = [chunk async for chunk in request.stream() if chunk]
+    return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+def client_address(request: Request) -> str:
+    """host:port of the calling client, or "unknown" behind transports that omit it"""
+    client = request.client
+    return f"{client.host}:{client.port}" if client else "unknown"
+
+# Most queued frames an SSE stream coalesces into a single write
+SSE_DRAIN_MAX = 32
+
+# Listing methods answered by the bridge itself (underlying servers often don't implement these)
+DISCOVERY_METHODS = ("tools/list", "resources/list", "prompts/list")
+
+# Bridge-level initialize result is fixed; the response is spliced around the request id
+INIT_RESPONSE_PREFIX = b'{"jsonrpc":"2.0","id":'
+INIT_RESPONSE_SUFFIX = b',"result":' + dumps_bytes({
+    "protocolVersion": "2024-11-05",
+    "capabilities": {
+        "resources": {},
+        "tools": {},
+        "prompts": {},
+        "logging": {}
+    },
+    "serverInfo": {
+        "name": "Smart Bridge",
+        "version": "1.0.0"
+    }
+}) + b"}"
+
 @app.get("/health")
 async def health():
     """Health check endpoint"""
@@ -77,61 +117,63 @@ async def sse_events(request: Request,
     if not broker:
         raise HTTPException(503, "Bridge not ready")
     
-    # Log the SSE connection attempt with full client details
-    client_info = f"{request.client.host}:{request.client.port}" if request.client else "unknown"
-    user_agent = request.headers.get("user-agent", "unknown")
-    priority = request.query_params.get("priority", "normal")
-    
-    logger.info(f"New SSE connection from {client_info}, User-Agent: {user_agent}")
+    # Log the SSE connection attempt with full client details (only gathered when INFO is on)
+    log_info = logger.isEnabledFor(logging.INFO)
+    if log_info:
+        client_info = client_address(request)
+        user_agent = request.headers.get("user-agent", "unknown")
+        priority = request.query_params.get("priority", "normal")
+        logger.info("New SSE connection from %s, User-Agent: %s", client_info, user_agent)
     
     # Auto-create session if not provided
     if not session:
         session_id = broker.create_session()
-        logger.info(f"Created new session {session_id} for client {client_info} with priority {priority}")
-        logger.debug(f"Session details - ID: {session_id}, Client: {client_info}, Priority: {priority}, UA: {user_agent}")
+        if log_info:
+            logger.info("Created new session %s for client %s with priority %s", session_id, client_info, priority)
+            logger.debug("Session details - ID: %s, Client: %s, Priority: %s, UA: %s", session_id, client_info, priority, user_agent)
         
-        # Return stream with MCP SSE endpoint event first (as per spec)
-        async def preface():
-            # Required: Send endpoint event first per MCP spec
-            base_url = str(request.base_url).rstrip("/")
-            endpoint_url = f"{base_url}/messages?session={session_id}"
-            yield f"event: endpoint\ndata: {endpoint_url}\n\n".encode()
-            
-            # Fall through to normal stream
-            async for chunk in event_stream_generator(session_id):
-                yield chunk
-        return StreamingResponse(preface(), media_type="text/event-stream")
-    else:
-        session_id = session
-        if session_id not in broker.sessions:
-            raise HTTPException(404, f"Session {session_id} not found")
-    
-    return StreamingResponse(event_stream_generator(session_id), media_type="text/event-stream")
+        # Required: Send endpoint event first per MCP spec
+        base_url = str(request.base_url).rstrip("/")
+        endpoint_url = f"{base_url}/messages?session={session_id}"
+        preface = SSE_ENDPOINT_PREFIX + endpoint_url.encode() + SSE_FRAME_END
+        return StreamingResponse(event_stream_generator(broker.sessions[session_id], preface), media_type="text/event-stream")
+    
+    # Single lookup; the stream gets the Session itself rather than re-resolving its id
+    existing = broker.sessions.get(session)
+    if existing is None:
+        raise HTTPException(404, f"Session {session} not found")
+    return StreamingResponse(event_stream_generator(existing), media_type="text/event-stream")
 
-async def event_stream_generator(session_id: str) -> AsyncGenerator[bytes, None]:
-    """Generate SSE event stream for a session per MCP spec"""
-    session = broker.get_session(session_id)
-    logger.debug(f"Starting SSE stream for session: {session_id}")
+async def event_stream_generator(session: Session, preface: Optional[bytes] = None) -> AsyncGenerator[bytes, None]:
+    """Generate SSE event stream for a session per MCP spec, optionally led by a preface frame"""
+    session_id = session.session_id
+    logger.debug("Starting SSE stream for session: %s", session_id)
+    if preface:
+        yield preface
     
     # Stream messages from broker
+    loop = asyncio.get_running_loop()
     while True:
         try:
-            # Wait for message with timeout for heartbeat (15s per spec)
-            try:
-                item = await asyncio.wait_for(session.queue.get(), timeout=15.0)
-                # Item should already be properly formatted as SSE by broker
-                yield item
+            # Broker queues a heartbeat comment when the session is idle (15s per spec)
+            item = await session.queue.get()
+            # Items are already SSE-framed by the broker; drain a burst into one write
+            parts = [item]
+            while len(parts) < SSE_DRAIN_MAX:
+                try:
+                    parts.append(session.queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            yield item if len(parts) == 1 else b"".join(parts)
+            for _ in parts:
                 session.queue.task_done()
-            except asyncio.TimeoutError:
-                # Send heartbeat comment per MCP spec
-                yield b": heartbeat\n\n"
                 
-            session.last_beat = time.time()
+            session.last_beat = loop.time()
                 
         except asyncio.CancelledError:
             break
         except Exception as e:
-            logger.error(f"Error in SSE stream for session {session_id}: {e}")
+            logger.error("Error in SSE stream for session %s: %s", session_id, e)
             break
 
 @app.post("/messages")
@@ -146,46 +188,37 @@ async def send_message(request: Request,
         raise HTTPException(503, "Bridge not ready")
     
     # Log request details
-    client_info = f"{request.client.host}:{request.client.port}" if request.client else "unknown"
+    client_info = client_address(request)
     priority = request.query_params.get("priority", "normal")
     
+    body = await read_body(request)
+    if not body:
+        # Reject before the parser ever sees it
+        logger.error("Empty request body from %s", client_info)
+        raise HTTPException(400, "Empty body")
     try:
-        payload = await request.json()
+        payload = loads(body)
         message_id = payload.get("id", "no-id")
-        method = payload.get("method", "no-method")
-        
-        logger.info(f"Received message from {client_info}: {method} (id: {message_id}, priority: {priority})")
-        logger.debug(f"Full message payload: {json.dumps(payload, indent=2)}")
+        # Routing only needs the method; read it once and branch on the local
+        method = payload.get("method")
     except Exception as e:
-        logger.error(f"Failed to parse JSON from {client_info}: {e}")
+        logger.error("Failed to parse JSON from %s: %s", client_info, e)
         raise HTTPException(400, "Invalid JSON")
     
+    logger.info("Received message from %s: %s (id: %s, priority: %s)", client_info, method or "no-method", message_id, priority)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Full message payload: %s", json.dumps(payload, indent=2))
+    
     # Handle MCP initialize request specially (bridge-level response + forward to server)
-    if payload.get("method") == "initialize":
+    if method == "initialize":
         session_id = request.query_params.get("session")
         if not session_id or session_id not in broker.sessions:
             raise HTTPException(400, "Valid session required for initialize")
             
-        # 1) Send immediate bridge-level response to Claude Code
-        bridge_response = {
-            "jsonrpc": "2.0",
-            "id": payload.get("id"),
-            "result": {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {
-                    "resources": {},
-                    "tools": {},
-                    "prompts": {},
-                    "logging": {}
-                },
-                "serverInfo": {
-                    "name": "Smart Bridge",
-                    "version": "1.0.0"
-                }
-            }
-        }
-        await broker._send(session_id, bridge_response)
-        logger.info(f"Sent bridge initialize response to session {session_id}")
+        # 1) Send immediate bridge-level response to Claude Code; only the id varies
+        bridge_response = INIT_RESPONSE_PREFIX + dumps_bytes(payload.get("id")) + INIT_RESPONSE_SUFFIX
+        await broker._send_encoded(session_id, [bridge_response])
+        logger.info("Sent bridge initialize response to session %s", session_id)
         
         # 2) Also forward initialize to underlying server so it's ready for other requests
         server_init_payload = {
@@ -194,24 +227,23 @@ async def send_message(request: Request,
             "method": "initialize",
             "params": payload.get("params", {})
         }
-        logger.debug(f"Forwarding initialize to underlying server")
+        logger.debug("Forwarding initialize to underlying server")
         await broker.route_from_client(session_id, server_init_payload)
         
-        return JSONResponse({"status": "accepted"}, status_code=202)
+        return FastJSONResponse({"status": "accepted"}, status_code=202)
     
     # Handle discovery requests at bridge level (underlying servers often don't implement these)
-    discovery_methods = ["tools/list", "resources/list", "prompts/list"]
-    if payload.get("method") in discovery_methods:
+    if method in DISCOVERY_METHODS:
         session_id = request.query_params.get("session")
         if not session_id or session_id not in broker.sessions:
             raise HTTPException(400, "Valid session required for discovery")
             
         # Get server type from command for appropriate tool definitions
-        cmd = app.state.config.cmd.lower() if hasattr(app.state, 'config') else ""
-        method = payload.get("method")
+        config = getattr(app.state, "config", None)
+        cmd = config.cmd.lower() if config is not None else ""
         request_id = payload.get("id")
         
-        logger.info(f"Handling bridge-level discovery: {method} (id: {request_id}) for {cmd}")
+        logger.info("Handling bridge-level discovery: %s (id: %s) for %s", method, request_id, cmd)
         
         if method == "tools/list":
             # Check if we have a tools config loaded
@@ -293,8 +325,8 @@ async def send_message(request: Request,
                 "result": {"resources": []}
             }
             await broker._send(session_id, resources_response)
-            logger.info(f"Sent bridge resources/list response (id: {request_id}) to session {session_id}")
-            return JSONResponse({"status": "accepted"}, status_code=202)
+            logger.info("Sent bridge resources/list response (id: %s) to session %s", request_id, session_id)
+            return FastJSONResponse({"status": "accepted"}, status_code=202)
             
         elif method == "prompts/list":
             prompts_response = {
@@ -303,27 +335,28 @@ async def send_message(request: Request,
                 "result": {"prompts": []}
             }
             await broker._send(session_id, prompts_response)
-            logger.info(f"Sent bridge prompts/list response (id: {request_id}) to session {session_id}")
-            return JSONResponse({"status": "accepted"}, status_code=202)
+            logger.info("Sent bridge prompts/list response (id: %s) to session %s", request_id, session_id)
+            return FastJSONResponse({"status": "accepted"}, status_code=202)
         
         # Send tools response if we got here
         if method == "tools/list":
             await broker._send(session_id, tools_response)
-            logger.info(f"Sent bridge tools/list response (id: {request_id}) to session {session_id} - {len(tools_response['result']['tools'])} tools")
-            return JSONResponse({"status": "accepted"}, status_code=202)
+            logger.info("Sent bridge tools/list response (id: %s) to session %s - %d tools", request_id, session_id, len(tools_response["result"]["tools"]))
+            return FastJSONResponse({"status": "accepted"}, status_code=202)
     
     # Ensure message has required JSON-RPC fields
     if isinstance(payload, dict) and "jsonrpc" not in payload:
         payload["jsonrpc"] = "2.0"
-    if "id" not in payload and payload.get("method"):
+    if "id" not in payload and method:
         payload["id"] = str(uuid.uuid4())
     
     # 1) Try explicit query param
     session_id = request.query_params.get("session")
     
-    # 2) Fallback: single open session
+    # 2) Fallback: single open session. O(1), and never guesses between several
+    # sessions, since "most recent" may not be the caller's under concurrent connects
     if not session_id and len(broker.sessions) == 1:
-        session_id = next(iter(broker.sessions.keys()))
+        session_id = next(iter(broker.sessions))
     
     if not session_id or session_id not in broker.sessions:
         raise HTTPException(400, "No valid session (pass ?session=..., or open exactly one SSE stream)")
@@ -335,11 +368,11 @@ async def send_message(request: Request,
     payload["meta"]["client_info"] = client_info
     payload["meta"]["timestamp"] = time.time()
     
-    logger.debug(f"Routing message {message_id} to session {session_id} with priority {priority}")
+    logger.debug("Routing message %s to session %s with priority %s", message_id, session_id, priority)
     await broker.route_from_client(session_id, payload)
     
     # Per MCP spec: return 202 Accepted for messages (responses come via SSE)
-    return JSONResponse({"status": "accepted"}, status_code=202)
+    return FastJSONResponse({"status": "accepted"}, status_code=202)
 
 @app.get("/sessions")
 async def list_sessions():
@@ -347,20 +380,24 @@ async def list_sessions():
     if not broker:
         raise HTTPException(503, "Bridge not ready")
     
+    # last_beat is on the loop's monotonic clock; report it as wall time
+    now = asyncio.get_running_loop().time()
+    wall = time.time()
     sessions_info = {}
     for session_id, session in broker.sessions.items():
+        age = now - session.last_beat
         sessions_info[session_id] = {
             "queue_size": session.queue.qsize(),
             "websocket_count": len(session.websockets),
-            "last_beat": session.last_beat,
-            "age_seconds": time.time() - session.last_beat
+            "last_beat": wall - age,
+            "age_seconds": age
         }
     
     logger.debug(f"Session list requested - {len(sessions_info)} active sessions")
     return {
         "active_sessions": len(sessions_info),
         "sessions": sessions_info,
-        "timestamp": time.time()
+        "timestamp": wall
     }
 
 @app.delete("/sessions/{session_id}")
@@ -391,29 +428,30 @@ def load_tools_config(tools_config_path: Optional[str]) -> Dict[str, Any]:
         return {}
 
 # OAuth/Auth endpoints for Claude Code compatibility
+# Discovery clients may poll these, so the fixed replies are serialized once
+NO_AUTH_BODY = dumps_bytes({
+    "error": "no_authentication_required",
+    "error_description": "This MCP server operates without authentication"
+})
+NO_REGISTRATION_BODY = dumps_bytes({
+    "error": "no_registration_required",
+    "error_description": "Client registration not required for this bridge"
+})
+
 @app.get("/.well-known/oauth-authorization-server")
 async def oauth_authorization_server():
     """OAuth Authorization Server Metadata - indicates no auth required"""
-    return JSONResponse({
-        "error": "no_authentication_required",
-        "error_description": "This MCP server operates without authentication"
-    }, status_code=404)
+    return Response(NO_AUTH_BODY, status_code=404, media_type="application/json")
 
 @app.get("/.well-known/oauth-protected-resource")
 async def oauth_protected_resource():
     """OAuth Protected Resource Metadata - indicates no auth required"""
-    return JSONResponse({
-        "error": "no_authentication_required", 
-        "error_description": "This MCP server operates without authentication"
-    }, status_code=404)
+    return Response(NO_AUTH_BODY, status_code=404, media_type="application/json")
 
 @app.post("/register")
 async def register_client():
     """Client registration - not required for this bridge"""
-    return JSONResponse({
-        "error": "no_registration_required",
-        "error_description": "Client registration not required for this bridge"
-    }, status_code=404)
+    return Response(NO_REGISTRATION_BODY, status_code=404, media_type="application/json")
 
 def setup_logging(log_level: str, log_location: Optional[str] = None, log_pattern: str = "bridge_{server}_{port}.log", 
                  server_name: str = "unknown", port: int = 8100):
@@ -447,6 +485,11 @@ def setup_logging(log_level: str, log_location: Optional[str] = None, log_patter
     
     # Set level
     logger.setLevel(getattr(logging, log_level.upper()))
+    
+    # Neither format prints thread/process fields; skip collecting them per record
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
 
 async def test_stdio_server_health(process: StdioProcess) -> bool:
     """Test if the underlying stdio MCP server is responding properly"""
@@ -500,6 +543,8 @@ async def init_broker(cmd: str):
             logger.warning("Stdio server health check failed, but continuing anyway...")
         
         broker = Broker(process)
+        # SSE streams block on their session queue, so idle ones rely on these heartbeats
+        broker.start_heartbeat()
         logger.info(f"✓ Broker successfully initialized with command: {cmd}")
         
     except Exception as e:
@@ -518,6 +563,8 @@ def main():
     parser.add_argument("--max_queue_size", type=int, default=100, help="Maximum queue size per session")
     parser.add_argument("--session_timeout", type=int, default=3600, help="Session timeout in seconds")
     parser.add_argument("--tools_config", help="JSON file with tool definitions for bridge-level discovery")
+    parser.add_argument("--loop", default="auto", choices=["auto", "asyncio", "uvloop"], help="Event loop implementation (auto picks uvloop when installed)")
+    parser.add_argument("--http", default="auto", choices=["auto", "h11", "httptools"], help="HTTP parser (auto picks httptools when installed)")
     
     args = parser.parse_args()
     
@@ -555,6 +602,7 @@ def main():
     logger.info(f"Queue strategy: {args.queue_strategy}")
     logger.info(f"Max queue size: {args.max_queue_size}")
     logger.info(f"Session timeout: {args.session_timeout}s")
+    logger.info(f"Event loop: {args.loop}, HTTP parser: {args.http}")
     if args.log_location:
         logger.info(f"Log location: {args.log_location}")
     
@@ -562,7 +610,9 @@ def main():
         app,
         host=args.host,
         port=args.port,
-        log_level="info"
+        log_level="info",
+        loop=args.loop,
+        http=args.http
     )
 
 if __name__ == "__main__":
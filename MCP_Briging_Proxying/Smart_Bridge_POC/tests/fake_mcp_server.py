@@ -0,0 +1,49 @@
+"""Minimal Content-Length framed MCP server for driving the SSE bridge in tests"""
+import json
+import sys
+
+stdin = sys.stdin.buffer
+stdout = sys.stdout.buffer
+
+
+def read_message():
+    length = None
+    while True:
+        line = stdin.readline()
+        if not line:
+            sys.exit(0)
+        line = line.strip()
+        if not line:
+            break
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"content-length":
+            length = int(value)
+    return json.loads(stdin.read(length))
+
+
+def write_message(obj):
+    data = json.dumps(obj).encode("utf-8")
+    stdout.write(b"Content-Length: %d\r\n\r\n" % len(data) + data)
+    stdout.flush()
+
+
+listings = 0
+while True:
+    msg = read_message()
+    method = msg.get("method")
+    if "id" not in msg:
+        continue  # notifications need no reply
+    if method == "initialize":
+        write_message({"jsonrpc": "2.0", "id": msg["id"], "result": {"capabilities": {"tools": {}, "logging": {}}}})
+    elif method == "tools/list":
+        listings += 1
+        write_message({"jsonrpc": "2.0", "id": msg["id"], "result": {"tools": [{"name": "echo"}], "listings": listings}})
+    elif method == "tools/call":
+        write_message({"jsonrpc": "2.0", "id": msg["id"], "error": {"code": -32602, "message": "Unknown tool"}})
+    elif method == "prompts/list":
+        pass  # never answered
+    elif method == "tools/reload":
+        write_message({"jsonrpc": "2.0", "method": "notifications/tools/list_changed"})
+        write_message({"jsonrpc": "2.0", "id": msg["id"], "result": {}})
+    else:
+        write_message({"jsonrpc": "2.0", "id": msg["id"], "result": {"echo": msg}})
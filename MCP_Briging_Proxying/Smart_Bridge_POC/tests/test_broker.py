@@ -1,7 +1,8 @@
 import pytest
 import asyncio
+import json
 from unittest.mock import AsyncMock, patch, MagicMock
-from Smart_Bridge_POC.broker import Broker, Session
+from Smart_Bridge_POC.broker import Broker, Session, encode_request_id, decode_request_id
 from Smart_Bridge_POC.process import StdioProcess
 from Smart_Bridge_POC.filters import filters
 
@@ -49,8 +50,18 @@ async def test_broker_route_from_client_with_id(broker, mock_stdio_process):
     await broker.route_from_client(session_id, payload)
 
     broker.filters.apply.assert_awaited_once_with("client_to_server", session_id, payload)
+    # Upstream sees an id that routes the response back to this session
+    mock_stdio_process.write_json.assert_awaited_once_with({**payload, "id": encode_request_id(session_id, 1)})
+    assert payload["id"] == 1  # caller's payload is not mutated
+
+@pytest.mark.asyncio
+async def test_broker_route_from_client_response_keeps_server_id(broker, mock_stdio_process):
+    session_id = broker.create_session()
+    # Reply to a server-initiated request (e.g. sampling); the server matches it by its own id
+    payload = {"jsonrpc": "2.0", "id": 0, "result": {}}
+    await broker.route_from_client(session_id, payload)
+
     mock_stdio_process.write_json.assert_awaited_once_with(payload)
-    assert broker.id_to_session[1] == session_id
 
 @pytest.mark.asyncio
 async def test_broker_route_from_client_filter_drops_message(broker, mock_stdio_process):
@@ -61,7 +72,6 @@ async def test_broker_route_from_client_filter_drops_message(broker, mock_stdio_
 
     broker.filters.apply.assert_awaited_once_with("client_to_server", session_id, payload)
     mock_stdio_process.write_json.assert_not_awaited()
-    assert 1 not in broker.id_to_session
 
 @pytest.mark.asyncio
 async def test_broker_pump_response_to_correct_session(broker):
@@ -70,11 +80,10 @@ async def test_broker_pump_response_to_correct_session(broker):
 
     # Simulate a request from session1
     req_payload = {"jsonrpc": "2.0", "method": "req", "id": 1}
-    broker.id_to_session[1] = session1_id
 
-    # Simulate a response from stdio process
+    # Simulate a response from stdio process, echoing the rewritten id
     res_payload = {"jsonrpc": "2.0", "result": "ok", "id": 1}
-    await broker.inbox.put(res_payload)
+    await broker.inbox.put({**res_payload, "id": encode_request_id(session1_id, 1)})
 
     # Allow pump to run
     await asyncio.sleep(0.01)
@@ -83,8 +92,38 @@ async def test_broker_pump_response_to_correct_session(broker):
     assert not broker.sessions[session1_id].queue.empty()
     assert broker.sessions[session2_id].queue.empty()
     received_data = await broker.sessions[session1_id].queue.get()
-    assert json.loads(received_data.decode().split("data: ")[1]) == res_payload
-    assert 1 not in broker.id_to_session # ID should be popped
+    assert json.loads(received_data.decode().split("data: ")[1]) == res_payload  # original id restored
+
+@pytest.mark.asyncio
+async def test_broker_pump_drops_response_for_closed_session(broker):
+    other_id = broker.create_session()
+
+    # Tagged for a session that no longer exists: must not fall through to a broadcast
+    await broker.inbox.put({"jsonrpc": "2.0", "result": "ok", "id": encode_request_id("gone", 1)})
+    await asyncio.sleep(0.01)
+
+    assert broker.sessions[other_id].queue.empty()
+
+def test_request_id_round_trip():
+    for original in (1, 0, "abc", "with|pipe", "7", None, 1.5, 2.0, True):
+        assert decode_request_id(encode_request_id("sid", original)) == ("sid", original)
+    assert decode_request_id(5) is None
+    assert decode_request_id("no-separator") is None
+    assert decode_request_id("sid|not json") is None
+
+@pytest.mark.asyncio
+async def test_broker_pump_broadcasts_server_request_with_tagged_looking_id(broker):
+    session_id = broker.create_session()
+    # A server-initiated request whose id happens to decode must not be routed or rewritten
+    request = {"jsonrpc": "2.0", "method": "roots/list", "id": encode_request_id("gone", 1)}
+
+    pump = asyncio.create_task(broker.pump())
+    await broker.inbox.put(dict(request))
+    await asyncio.sleep(0.01)
+    pump.cancel()
+
+    data = await broker.sessions[session_id].queue.get()
+    assert json.loads(data.decode().split("data: ")[1]) == request
 
 @pytest.mark.asyncio
 async def test_broker_pump_notification_broadcast(broker):
@@ -106,6 +145,26 @@ async def test_broker_pump_notification_broadcast(broker):
     assert json.loads(received_data1.decode().split("data: ")[1]) == notif_payload
     assert json.loads(received_data2.decode().split("data: ")[1]) == notif_payload
 
+@pytest.mark.asyncio
+async def test_broker_pump_broadcast_keeps_per_session_filter_results(broker):
+    session1_id = broker.create_session()
+    session2_id = broker.create_session()
+
+    # Edits the shared message in place, like add_bridge_meta
+    def stamp(direction, session_id, msg):
+        msg["session"] = session_id
+        return msg
+    broker.filters.apply = AsyncMock(side_effect=stamp)
+
+    pump = asyncio.create_task(broker.pump())
+    await broker.inbox.put({"jsonrpc": "2.0", "method": "notif"})
+    await asyncio.sleep(0.01)
+    pump.cancel()
+
+    for sid in (session1_id, session2_id):
+        data = await broker.sessions[sid].queue.get()
+        assert json.loads(data.decode().split("data: ")[1])["session"] == sid
+
 @pytest.mark.asyncio
 async def test_broker_send_sse(broker):
     session_id = broker.create_session()
@@ -139,6 +198,36 @@ async def test_broker_send_websocket_disconnect(broker):
 
     assert mock_websocket not in broker.sessions[session_id].websockets
 
+@pytest.mark.asyncio
+async def test_broker_send_encoded_skips_serialization(broker):
+    session_id = broker.create_session()
+    mock_websocket = AsyncMock()
+    broker.sessions[session_id].websockets.add(mock_websocket)
+
+    await broker._send_encoded(session_id, [b'{"id":1}', b'{"id":2}'])
+
+    data = await broker.sessions[session_id].queue.get()
+    assert data == b'event: message\ndata: {"id":1}\n\nevent: message\ndata: {"id":2}\n\n'
+    assert [c.args[0] for c in mock_websocket.send_text.await_args_list] == ['{"id":1}', '{"id":2}']
+
+    await broker._send_encoded("non_existent_session", [b"{}"])  # silently ignored
+
+@pytest.mark.asyncio
+async def test_broker_send_waits_when_session_queue_full(broker):
+    session_id = broker.create_session()
+    queue = broker.sessions[session_id].queue
+    for _ in range(queue.maxsize):
+        queue.put_nowait(b"x")
+
+    # Must wait for the SSE consumer rather than drop the batch
+    send = asyncio.create_task(broker._send_encoded(session_id, [b'{"id":1}']))
+    await asyncio.sleep(0.01)
+    assert not send.done()
+
+    queue.get_nowait()
+    await asyncio.wait_for(send, timeout=1)
+    assert queue.qsize() == queue.maxsize
+
 @pytest.mark.asyncio
 async def test_broker_broadcast(broker):
     session1_id = broker.create_session()
@@ -1,6 +1,8 @@
 import pytest
 import asyncio
+import threading
 import time
+from Smart_Bridge_POC import filters as filters_module
 from Smart_Bridge_POC.filters import FilterChain, redact_secrets, add_bridge_meta
 
 @pytest.fixture
@@ -41,6 +43,15 @@ async def test_filter_chain_apply_enabled_filter(filter_chain):
     result = await filter_chain.apply("test_direction", "test_session", message)
     assert result == {"text": "HELLO", "value": 123}
 
+@pytest.mark.asyncio
+async def test_filter_chain_awaits_sync_wrapped_async_filter(filter_chain):
+    async def uppercase_filter(direction, session_id, msg):
+        return {k: v.upper() if isinstance(v, str) else v for k, v in msg.items()}
+
+    filter_chain.register("wrapped", lambda d, s, m: uppercase_filter(d, s, m), enabled=True)
+    result = await filter_chain.apply("test_direction", "test_session", {"text": "hello"})
+    assert result == {"text": "HELLO"}
+
 @pytest.mark.asyncio
 async def test_filter_chain_apply_disabled_filter(filter_chain):
     async def uppercase_filter(direction, session_id, msg):
@@ -69,6 +80,19 @@ async def test_filter_chain_apply_exception_filter(filter_chain):
     result = await filter_chain.apply("test_direction", "test_session", message)
     assert result == message  # Message should pass through if filter fails
 
+@pytest.mark.asyncio
+async def test_filter_chain_offloads_large_payloads(filter_chain, monkeypatch):
+    monkeypatch.setattr(filters_module, "OFFLOAD_THRESHOLD", 10)
+    seen = []
+    def record_thread(direction, session_id, msg):
+        seen.append(threading.current_thread() is threading.main_thread())
+        return msg
+
+    filter_chain.register("record", record_thread, enabled=True)
+    await filter_chain.apply("test_direction", "test_session", {"text": "short"})
+    await filter_chain.apply("test_direction", "test_session", {"text": "x" * 64})
+    assert seen == [True, False]
+
 @pytest.mark.asyncio
 async def test_redact_secrets():
     message = {
@@ -0,0 +1,95 @@
+import pytest
+import pytest_asyncio
+import asyncio
+import functools
+import json
+import os
+import sys
+import httpx
+from Smart_Bridge_POC import mcp_sse_bridge
+from Smart_Bridge_POC.mcp_sse_bridge import MCPSSEBridge, SSE_DATA_PREFIX
+
+FAKE_SERVER = os.path.join(os.path.dirname(__file__), "fake_mcp_server.py")
+
+@pytest_asyncio.fixture
+async def bridge(monkeypatch):
+    # exec so terminate() signals the server itself, not a wrapping shell
+    b = MCPSSEBridge(cmd=f'exec "{sys.executable}" "{FAKE_SERVER}"')
+    await b.start()
+    monkeypatch.setattr(mcp_sse_bridge, "bridge", b)
+    yield b
+    await b.stop()
+
+@pytest_asyncio.fixture
+async def client(bridge):
+    transport = httpx.ASGITransport(app=mcp_sse_bridge.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+        yield c
+
+async def connect(client) -> str:
+    response = await client.post("/sse")
+    assert response.status_code == 200
+    return response.json()["transport"]["url"].split("/")[-2]
+
+@pytest.mark.asyncio
+async def test_bridge_initializes_despite_unmodelled_capabilities(bridge):
+    assert bridge.initialized
+    assert bridge.capabilities.tools == {}
+
+@pytest.mark.asyncio
+async def test_forward_request_relays_result(client):
+    cid = await connect(client)
+    response = await client.post(f"/sse/{cid}/prompts/greet/get", json={"name": "x"})
+    assert response.status_code == 200
+    echoed = response.json()["echo"]
+    assert echoed["method"] == "prompts/get"
+    assert echoed["params"] == {"name": "greet", "arguments": {"name": "x"}}
+
+@pytest.mark.asyncio
+async def test_forward_request_maps_error_to_502(client):
+    cid = await connect(client)
+    response = await client.post(f"/sse/{cid}/tools/missing/call", json={})
+    assert response.status_code == 502
+    assert response.json()["detail"]["message"] == "Unknown tool"
+
+@pytest.mark.asyncio
+async def test_forward_request_maps_timeout_to_504(bridge, client, monkeypatch):
+    monkeypatch.setattr(bridge, "request", functools.partial(bridge.request, timeout=0.1))
+    cid = await connect(client)
+    response = await client.get(f"/sse/{cid}/prompts")
+    assert response.status_code == 504
+    assert not bridge.pending
+
+@pytest.mark.asyncio
+async def test_client_request_id_restored_on_stream(bridge, client):
+    cid = await connect(client)
+    stream = bridge.get_message_stream(cid)
+    await stream.__anext__()  # retry
+    await stream.__anext__()  # hello
+
+    response = await client.post(f"/sse/{cid}/message", json={"jsonrpc": "2.0", "id": 5, "method": "ping"})
+    assert response.status_code == 200
+
+    frame = await asyncio.wait_for(stream.__anext__(), timeout=2)
+    message = json.loads(frame[len(SSE_DATA_PREFIX):])
+    assert message["id"] == 5
+    assert message["result"]["echo"]["id"] != 5  # upstream saw the connection-tagged id
+    await stream.aclose()
+    assert cid not in bridge.connections
+
+@pytest.mark.asyncio
+async def test_listing_cache_hit_and_list_changed_invalidation(bridge, client):
+    cid = await connect(client)
+    first = (await client.get(f"/sse/{cid}/tools")).json()
+    second = (await client.get(f"/sse/{cid}/tools")).json()
+    assert first["listings"] == second["listings"] == 1
+
+    response = await client.post(f"/sse/{cid}/message", json={"jsonrpc": "2.0", "id": 1, "method": "tools/reload"})
+    assert response.status_code == 200
+    for _ in range(100):
+        if "tools/list" not in bridge.listings:
+            break
+        await asyncio.sleep(0.01)
+
+    third = (await client.get(f"/sse/{cid}/tools")).json()
+    assert third["listings"] == 2
@@ -53,7 +53,6 @@ async def test_stdio_process_write_json():
 @pytest.mark.asyncio
 async def test_stdio_process_read_json():
     mock_proc = AsyncMock()
-    mock_proc.stdout = AsyncMock()
     mock_proc.stdin = AsyncMock()
     mock_proc.stderr = AsyncMock()
     mock_proc.stderr.readline.return_value = b''
@@ -61,8 +60,10 @@ async def test_stdio_process_read_json():
     test_obj = {"result": "success"}
     framed_data = encode_framed_json(test_obj)
 
-    # Mock the stdout to return framed data chunk by chunk
-    mock_proc.stdout.read.side_effect = [framed_data[i:i+1] for i in range(len(framed_data))] + [b'']
+    # Real StreamReader for stdout so the framing layer can use its buffered reads
+    mock_proc.stdout = asyncio.StreamReader()
+    mock_proc.stdout.feed_data(framed_data)
+    mock_proc.stdout.feed_eof()
 
     with patch('asyncio.create_subprocess_shell', return_value=mock_proc):
         process = StdioProcess(cmd='test')
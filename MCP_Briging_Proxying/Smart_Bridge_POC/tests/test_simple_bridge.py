@@ -0,0 +1,25 @@
+import pytest
+import asyncio
+import os
+import sys
+from Smart_Bridge_POC import broker as broker_module
+from Smart_Bridge_POC import simple_bridge
+from Smart_Bridge_POC.broker import HEARTBEAT_FRAME
+
+FAKE_SERVER = os.path.join(os.path.dirname(__file__), "fake_mcp_server.py")
+
+@pytest.mark.asyncio
+async def test_idle_stream_receives_heartbeat(monkeypatch):
+    monkeypatch.setattr(broker_module, "HEARTBEAT_INTERVAL", 0.05)
+    monkeypatch.setattr(simple_bridge, "broker", None)
+    await simple_bridge.init_broker(f'exec "{sys.executable}" "{FAKE_SERVER}"')
+    broker = simple_bridge.broker
+    try:
+        session_id = broker.create_session()
+        stream = simple_bridge.event_stream_generator(broker.sessions[session_id])
+        # No traffic at all: the only thing the stream can yield is a heartbeat
+        assert await asyncio.wait_for(stream.__anext__(), timeout=2) == HEARTBEAT_FRAME
+        await stream.aclose()
+    finally:
+        broker._heartbeat_task.cancel()
+        await broker.proc.terminate()
@@ -20,9 +20,33 @@ from dataclasses import dataclass, field
 from typing import Any, AsyncGenerator, Dict, Optional, Callable, List, Set
 
 from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse, HTMLResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse, PlainTextResponse, HTMLResponse
 from pydantic import BaseModel, Field
 
+# Optional: orjson encodes straight to UTF-8 bytes, skipping the str round trip
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    def dumps_bytes(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    loads = orjson.loads
+else:
+    def dumps_bytes(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+    loads = json.loads
+
+# SSE framing pieces, concatenated around payload bytes
+SSE_RETRY = b"retry: 3000\\n\\n"
+SSE_DATA = b"data: "
+SSE_END = b"\\n\\n"
+SSE_KEEPALIVE = b": keep-alive\\n\\n"
+SSE_DRAIN_MAX = 32  # most queued frames coalesced into one write
+
 # ----------------------------- Logging ------------------------------------
 logger = logging.getLogger("stdio-gateway")
 handler = logging.StreamHandler(sys.stderr)
@@ -230,7 +254,7 @@ class Session:
     session_id: str
     queue: asyncio.Queue[bytes] = field(default_factory=lambda: asyncio.Queue(maxsize=100))
     websockets: Set[WebSocket] = field(default_factory=set)
-    last_beat: float = field(default_factory=time.time)
+    last_beat: float = field(default_factory=time.monotonic)  # loop.time() clock
 
 class Broker:
     def __init__(self, proc: StdioProcess):
@@ -306,15 +330,19 @@ class Broker:
         if session_id not in self.sessions:
             return
         sess = self.sessions[session_id]
+        payload = dumps_bytes(obj)
         try:
-            data = f"data: {json.dumps(obj, ensure_ascii=False)}\\n\\n".encode("utf-8")
+            data = SSE_DATA + payload + SSE_END
             await sess.queue.put(data)
         except asyncio.QueueFull:
             logger.warning("Session %s SSE queue full; dropping message", session_id)
+        if not sess.websockets:
+            return
+        text = payload.decode("utf-8")
         dead: List[WebSocket] = []
         for ws in list(sess.websockets):
             try:
-                await ws.send_text(json.dumps(obj, ensure_ascii=False))
+                await ws.send_text(text)
             except Exception:
                 dead.append(ws)
         for ws in dead:
@@ -328,7 +356,12 @@ class Broker:
             await self._send(sid, obj)
 
 # ----------------------------- App ----------------------------------------
-app = FastAPI(title="Stdio Gateway", version="1.1.0", description="Expose a stdio JSON-RPC server over HTTP/SSE/WebSocket with filters")
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps_bytes(content)
+
+app = FastAPI(title="Stdio Gateway", version="1.1.0", description="Expose a stdio JSON-RPC server over HTTP/SSE/WebSocket with filters",
+              default_response_class=FastJSONResponse)
 
 bridge_proc: Optional[StdioProcess] = None
 broker: Optional[Broker] = None
@@ -336,24 +369,30 @@ broker: Optional[Broker] = None
 @app.on_event("startup")
 async def _startup():
     global bridge_proc, broker
-    if not hasattr(app.state, "config"):
+    cfg = getattr(app.state, "config", None)
+    if cfg is None:
         return
-    cfg = app.state.config
     bridge_proc = StdioProcess(cmd=cfg.cmd, cwd=cfg.cwd, env=os.environ.copy())
     broker = Broker(bridge_proc)
     await broker.start()
 
+# Polled constantly by orchestrators; both possible replies are built once
+HEALTH_OK = Response(b'{"status":"ok"}', media_type="application/json")
+HEALTH_DEGRADED = Response(b'{"status":"degraded"}', media_type="application/json")
+
 @app.get("/health")
 async def health():
-    ok = (bridge_proc is not None and broker is not None and bridge_proc.proc and bridge_proc.proc.returncode is None)
-    return JSONResponse({"status": "ok" if ok else "degraded"})
+    proc = bridge_proc.proc if bridge_proc is not None and broker is not None else None
+    return HEALTH_OK if proc is not None and proc.returncode is None else HEALTH_DEGRADED
 
-@app.post("/sessions", response_model=SessionOut)
+# Acks are built here, so they are returned directly instead of validated through
+# a response_model; responses= keeps the schema in the OpenAPI docs
+@app.post("/sessions", responses={200: {"model": SessionOut}})
 async def create_session():
     if broker is None:
         raise HTTPException(503, "Bridge not ready")
     sid = broker.create_session()
-    return SessionOut(session=sid)
+    return FastJSONResponse({"session": sid})
 
 @app.get("/events")
 async def events(session: str):
@@ -365,37 +404,51 @@ async def events(session: str):
         raise HTTPException(404, "Unknown session")
 
     async def event_stream() -> AsyncGenerator[bytes, None]:
-        yield b"retry: 3000\\n\\n"
+        yield SSE_RETRY
         hello = {"type": "bridge/hello", "session": session, "ts": time.time()}
-        yield f"data: {json.dumps(hello)}\\n\\n".encode()
-        while True:
-            try:
+        yield SSE_DATA + dumps_bytes(hello) + SSE_END
+        loop = asyncio.get_running_loop()
+        # One pending get() survives idle ticks, so keep-alives raise nothing
+        getter = asyncio.ensure_future(sess.queue.get())
+        try:
+            while True:
                 try:
-                    item = await asyncio.wait_for(sess.queue.get(), timeout=15)
-                    yield item
-                    sess.queue.task_done()
-                except asyncio.TimeoutError:
-                    yield b": keep-alive\\n\\n"
-                sess.last_beat = time.time()
-            except asyncio.CancelledError:
-                break
-            except Exception:
-                logger.exception("SSE stream error")
-                break
+                    done, _ = await asyncio.wait((getter,), timeout=15)
+                    if done:
+                        item = getter.result()
+                        getter = asyncio.ensure_future(sess.queue.get())
+                        parts = [item]
+                        while len(parts) < SSE_DRAIN_MAX:
+                            try:
+                                parts.append(sess.queue.get_nowait())
+                            except asyncio.QueueEmpty:
+                                break
+                        yield item if len(parts) == 1 else b"".join(parts)
+                        for _ in parts:
+                            sess.queue.task_done()
+                    else:
+                        yield SSE_KEEPALIVE
+                    sess.last_beat = loop.time()
+                except asyncio.CancelledError:
+                    break
+                except Exception:
+                    logger.exception("SSE stream error")
+                    break
+        finally:
+            getter.cancel()
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 @app.websocket("/ws")
 async def ws_endpoint(websocket: WebSocket):
     await websocket.accept()
-    params = dict(websocket.query_params)
-    sid = params.get("session")
+    sid = websocket.query_params.get("session")
     if broker is None:
         await websocket.close(code=1011)
         return
     if not sid:
         sid = broker.create_session()
-        await websocket.send_text(json.dumps({"type": "bridge/session", "session": sid}))
+        await websocket.send_text(dumps_bytes({"type": "bridge/session", "session": sid}).decode("utf-8"))
     try:
         sess = broker.get_session(sid)
     except KeyError:
@@ -404,11 +457,15 @@ async def ws_endpoint(websocket: WebSocket):
     sess.websockets.add(websocket)
     try:
         while True:
-            msg = await websocket.receive_text()
+            # Raw ASGI receive: binary frames go to the parser as-is, text frames as str
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            raw = message.get("bytes") or message.get("text")
             try:
-                payload = json.loads(msg)
+                payload = loads(raw)
             except Exception:
-                await websocket.send_text(json.dumps({"error": "invalid json"}))
+                await websocket.send_text('{"error":"invalid json"}')
                 continue
             if isinstance(payload, dict) and "jsonrpc" not in payload:
                 payload["jsonrpc"] = "2.0"
@@ -423,12 +480,21 @@ async def ws_endpoint(websocket: WebSocket):
         except KeyError:
             pass
 
-@app.post("/messages", response_model=PostAccepted)
+async def read_body(request: Request) -> bytes:
+    # Straight from the ASGI stream: no cached copy, and the body is usually one chunk
+    chunks = [chunk async for chunk in request.stream() if chunk]
+    return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+@app.post("/messages", responses={200: {"model": PostAccepted}})
 async def post_message(request: Request):
     if broker is None:
         raise HTTPException(503, "Bridge not ready")
+    body = await read_body(request)
+    if not body:
+        raise HTTPException(400, "Empty body")
     try:
-        payload = await request.json()
+        # Parse the raw body directly rather than through Starlette's stdlib json path
+        payload = loads(body)
     except Exception:
         raise HTTPException(400, "Invalid JSON")
 
@@ -444,7 +510,7 @@ async def post_message(request: Request):
         payload["id"] = str(uuid.uuid4())
 
     await broker.route_from_client(session_id, payload)
-    return PostAccepted(id=str(payload.get("id")))
+    return FastJSONResponse({"status": "accepted", "id": str(payload.get("id"))})
 
 @app.get("/filters", response_model=List[FilterInfo])
 async def list_filters():
@@ -458,25 +524,21 @@ async def toggle_filter(name: str, body: ToggleFilterIn):
         raise HTTPException(404, f"Unknown filter {name}")
     return {"status": "ok", "name": name, "enabled": body.enabled}
 
-@app.get("/live")
-async def live():
-    if broker is None:
-        raise HTTPException(503, "Bridge not ready")
-    sid = broker.create_session()
-    html = f'''<!doctype html>
+# Built once at import: /live only splices the session id between the byte chunks
+LIVE_HTML = '''<!doctype html>
 <html>
 <head><meta charset="utf-8"><title>Stdio Gateway Live</title></head>
 <body style="font-family: system-ui, sans-serif; margin: 1rem;">
-<h1>Live Stream (session {sid})</h1>
+<h1>Live Stream (session SESSION_ID)</h1>
 <pre id="log" style="border:1px solid #ccc; padding:1rem; height:50vh; overflow:auto; background:#fafafa"></pre>
 <form id="f" style="margin-top:1rem">
-  <textarea id="payload" rows="6" style="width:100%" placeholder='{{"jsonrpc":"2.0","method":"ping","id":"1"}}'></textarea>
+  <textarea id="payload" rows="6" style="width:100%" placeholder='{"jsonrpc":"2.0","method":"ping","id":"1"}'></textarea>
   <button>Send</button>
 </form>
 <script>
-  const sid = {json.dumps(sid)!r};
+  const sid = "SESSION_ID";
   const log = document.getElementById('log');
-  function append(x) { log.textContent += x + "\\n"; log.scrollTop = log.scrollHeight; }
+  function append(x) { log.textContent += x + "\\\\n"; log.scrollTop = log.scrollHeight; }
   const es = new EventSource('/events?session=' + sid);
   es.onmessage = (e) => append(e.data);
   es.onerror = () => append('[SSE error]');
@@ -490,11 +552,20 @@ async def live():
 </script>
 </body>
 </html>'''
-    return HTMLResponse(html)
+LIVE_HTML_PARTS = [part.encode("utf-8") for part in LIVE_HTML.split("SESSION_ID")]
+
+@app.get("/live")
+async def live():
+    if broker is None:
+        raise HTTPException(503, "Bridge not ready")
+    sid = broker.create_session()
+    return HTMLResponse(sid.encode("ascii").join(LIVE_HTML_PARTS))
+
+ROOT_RESPONSE = PlainTextResponse("Stdio gateway is running. See /docs for OpenAPI, /live for a viewer.")
 
 @app.get("/")
 async def root():
-    return PlainTextResponse("Stdio gateway is running. See /docs for OpenAPI, /live for a viewer.")
+    return ROOT_RESPONSE
 
 # ----------------------------- Main ---------------------------------------
 def parse_args(argv: Optional[list[str]] = None):
@@ -503,13 +574,20 @@ def parse_args(argv: Optional[list[str]] = None):
     p.add_argument("--port", type=int, default=int(os.environ.get("PORT", 8080)))
     p.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
     p.add_argument("--cwd", default=None)
+    # "auto" uses uvloop/httptools when installed (POSIX only) and falls back to asyncio/h11
+    p.add_argument("--loop", default="auto", choices=["auto", "asyncio", "uvloop"])
+    p.add_argument("--http", default="auto", choices=["auto", "h11", "httptools"])
     return p.parse_args(argv)
 
 def main():
     args = parse_args()
     app.state.config = args
+    # The log format has no thread/process fields; skip collecting them per record
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
     import uvicorn
-    uvicorn.run(app, host=args.host, port=args.port, log_level="info")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="info", loop=args.loop, http=args.http)
 
 if __name__ == "__main__":
     try: